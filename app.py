@@ -18,13 +18,35 @@ import shutil
 from urllib.parse import urlparse, urljoin
 import xml.etree.ElementTree as ET
 import base64
+import copy
+import re
 import time
 import requests
 from typing import Dict, List, Optional
 import binascii
+import threading
+from collections import deque
+from functools import lru_cache
+from string import Template
 from typing import Dict, List, Optional
 import time
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 优先使用libyaml的C实现解析和输出YAML
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -32,6 +54,156 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 每个子进程保留的最近输出行数上限
+PROCESS_OUTPUT_TAIL_LINES = 512
+
+# HLS段文件发送块大小
+SEGMENT_CHUNK_SIZE = 256 * 1024
+
+# 解密进程到FFmpeg的管道缓冲区大小（Linux默认64KiB，非特权进程上限通常为1MiB）
+PIPE_BUFFER_SIZE = 1024 * 1024
+
+# 根路径兜底页面：内容固定，导入时一次性编码
+_WELCOME_HTML_BYTES = '''<!DOCTYPE html>
+<html>
+<head>
+    <title>MPD流媒体服务</title>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
+        .container { background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        h1 { color: #333; }
+        .status { color: #28a745; font-weight: bold; }
+        ul { list-style: none; padding: 0; }
+        li { margin: 10px 0; }
+        a { color: #007bff; text-decoration: none; padding: 8px 15px; border: 1px solid #007bff; border-radius: 5px; display: inline-block; }
+        a:hover { background: #007bff; color: white; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🎬 MPD到HLS流媒体转换服务</h1>
+        <p class="status">✅ 服务运行正常！</p>
+        <p>通过反向代理访问成功</p>
+        <h3>📋 可用功能:</h3>
+        <ul>
+            <li><a href="/index.html">📊 完整管理界面</a></li>
+            <li><a href="/demo.html">🎬 演示页面</a></li>
+            <li><a href="/health">❤️ 健康检查</a></li>
+            <li><a href="/streams">🔗 API接口</a></li>
+        </ul>
+    </div>
+</body>
+</html>
+'''.encode('utf-8')
+
+_ERROR_HTML_TEMPLATE = Template('''<!DOCTYPE html>
+<html>
+<head><title>服务错误</title></head>
+<body>
+    <h1>服务暂时不可用</h1>
+    <p>错误信息: $error</p>
+    <p><a href="/health">检查服务健康状态</a></p>
+</body>
+</html>
+''')
+
+def _json_response(data, **kwargs) -> web.Response:
+    """JSON响应，可用时使用orjson直接序列化为bytes"""
+    if orjson is None:
+        return web.json_response(data, **kwargs)
+    return web.Response(body=orjson.dumps(data), content_type='application/json', **kwargs)
+
+# FFmpeg错误分析规则，按优先级排列: (匹配模式, 说明)
+_FFMPEG_ERROR_RULES = (
+    # 网络连接错误
+    (r"connection reset by peer", "网络连接被重置，可能是源服务器问题或网络不稳定"),
+    (r"connection refused", "连接被拒绝，源服务器可能不可达"),
+    (r"timeout|timed out", "连接超时，网络延迟过高或源服务器响应慢"),
+    (r"403|forbidden", "访问被禁止，可能需要认证或IP被封"),
+    (r"404|not found", "资源不存在，URL可能已失效"),
+    (r"500|internal server error", "源服务器内部错误"),
+    # SSL/TLS错误
+    (r"ssl|tls", "SSL/TLS握手失败，可能是证书问题"),
+    # 格式/编解码错误
+    (r"invalid data|corrupt", "数据损坏或格式不支持"),
+    (r"no decoder", "缺少解码器或格式不支持"),
+    # 解密相关错误
+    (r"decryption", "解密失败，密钥可能不正确"),
+    # 输出相关错误
+    (r"permission denied", "文件权限错误"),
+    (r"disk full|no space", "磁盘空间不足"),
+)
+
+# 所有规则合并为一个正则，每条规则一个分组；零宽前瞻保证每个位置都会被检查，
+# 不会因为低优先级规则先消耗文本而漏掉重叠的高优先级匹配
+_FFMPEG_ERROR_RE = re.compile(
+    '(?=' + '|'.join(f'({pattern})' for pattern, _ in _FFMPEG_ERROR_RULES) + ')',
+    re.IGNORECASE
+)
+
+def _enlarge_pipe(fd: int):
+    """在Linux上扩大管道的内核缓冲区，平滑码率波动时生产者与FFmpeg之间的速率差"""
+    if fcntl is None or not hasattr(fcntl, 'F_SETPIPE_SZ'):
+        return
+    try:
+        fcntl.fcntl(fd, fcntl.F_SETPIPE_SZ, PIPE_BUFFER_SIZE)
+    except OSError as e:
+        logger.debug(f"无法扩大管道缓冲区: {e}")
+
+@lru_cache(maxsize=None)
+def _tool_available(name: str, version_flag: str) -> bool:
+    """检测外部工具是否可用（进程内缓存，PATH中不存在时不启动子进程）"""
+    if shutil.which(name) is None:
+        return False
+    try:
+        result = subprocess.run([name, version_flag], stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, timeout=5)
+        return result.returncode == 0
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return False
+
+@lru_cache(maxsize=8)
+def _load_yaml_cached(path: str, mtime_ns: int, size: int):
+    """按 (路径, 修改时间, 大小) 缓存解析结果，文件未变化时不重复解析YAML"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+# Kodi流信息中的一行：#KODIPROP:键=值 或以http开头的流URL，忽略行首尾空白
+_KODI_LINE_RE = re.compile(
+    r'^[^\S\n]*(?:#KODIPROP:(?P<key>[^=\n]*)=(?P<value>[^\n]*?)|(?P<url>http[^\n]*?))[^\S\n]*$',
+    re.MULTILINE
+)
+
+@lru_cache(maxsize=1024)
+def _parse_kodi_props_cached(stream_text: str) -> tuple:
+    """解析Kodi属性格式的流信息，结果以不可变元组缓存，相同文本只解析一次"""
+    props = {}
+    url = None
+    
+    # 一次正则扫描同时取出属性行和URL行，多个URL时以最后一个为准
+    for match in _KODI_LINE_RE.finditer(stream_text):
+        if match.group('url') is not None:
+            url = match.group('url')
+        else:
+            props[match.group('key')] = match.group('value')
+    
+    return (
+        ('url', url),
+        ('manifest_type', props.get('inputstream.adaptive.manifest_type')),
+        ('license_type', props.get('inputstream.adaptive.license_type')),
+        ('license_key', props.get('inputstream.adaptive.license_key'))
+    )
+
+@lru_cache(maxsize=1024)
+def _parse_clearkey_license_cached(license_key: str) -> tuple:
+    """解析ClearKey许可证 (key_id:key)，结果以不可变元组缓存"""
+    if ':' in license_key:
+        key_id, key = license_key.split(':', 1)
+        # 移除可能的空格和特殊字符
+        return (('key_id', key_id.strip()), ('key', key.strip()))
+    return ()
+
 class DashDecryptor:
     """DASH流解密器 - 支持ClearKey解密"""
     
@@ -42,33 +214,11 @@ class DashDecryptor:
     
     def _detect_tools(self) -> Dict[str, bool]:
         """检测可用的解密工具"""
-        tools = {}
-        
-        # 检查yt-dlp
-        try:
-            result = subprocess.run(['yt-dlp', '--version'], 
-                                  capture_output=True, timeout=5)
-            tools['yt-dlp'] = result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            tools['yt-dlp'] = False
-            
-        # 检查mp4decrypt
-        try:
-            result = subprocess.run(['mp4decrypt', '--version'], 
-                                  capture_output=True, timeout=5)
-            tools['mp4decrypt'] = result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            tools['mp4decrypt'] = False
-            
-        # 检查ffmpeg
-        try:
-            result = subprocess.run(['ffmpeg', '-version'], 
-                                  capture_output=True, timeout=5)
-            tools['ffmpeg'] = result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            tools['ffmpeg'] = False
-            
-        return tools
+        return {
+            'yt-dlp': _tool_available('yt-dlp', '--version'),
+            'mp4decrypt': _tool_available('mp4decrypt', '--version'),
+            'ffmpeg': _tool_available('ffmpeg', '-version'),
+        }
     
     async def decrypt_stream(self, mpd_url: str, output_dir: str, 
                            license_key: str = None) -> Optional[str]:
@@ -183,18 +333,30 @@ class MPDToHLSStreamer:
             config_path = os.getenv('CONFIG_PATH', '/app/config/config.yaml')
         self.config_path = config_path
         self.config = self.load_config()
-        self.temp_dir = tempfile.mkdtemp()
+        self.temp_dir = self._create_hls_dir()
         self.sessions: Dict[str, dict] = {}
         self.active_streams: Dict[str, dict] = {}  # 记录活跃的流状态
         self.dash_decryptor = DashDecryptor()  # 初始化解密器
         logger.info(f"初始化MPD转HLS流媒体服务器，临时目录: {self.temp_dir}")
         logger.info(f"配置文件路径: {self.config_path}")
 
+    def _create_hls_dir(self) -> str:
+        """创建HLS输出目录；配置了 server.hls_dir 时建在该目录下（如 /dev/shm 等tmpfs，分片不落盘）"""
+        hls_dir = (self.config.get('server') or {}).get('hls_dir')
+        if hls_dir:
+            try:
+                os.makedirs(hls_dir, exist_ok=True)
+                return tempfile.mkdtemp(prefix='mpdstream_', dir=hls_dir)
+            except OSError as e:
+                logger.warning(f"无法使用HLS目录 {hls_dir}: {e}，改用系统临时目录")
+        return tempfile.mkdtemp()
+
     def load_config(self) -> dict:
         """加载配置文件，如果不存在则创建默认配置文件"""
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            stat = os.stat(self.config_path)
+            # 返回副本，调用方修改配置不会污染缓存
+            config = copy.deepcopy(_load_yaml_cached(self.config_path, stat.st_mtime_ns, stat.st_size))
             logger.info(f"已加载配置文件: {self.config_path}")
             return config
         except FileNotFoundError:
@@ -215,7 +377,8 @@ class MPDToHLSStreamer:
             config_dir.mkdir(parents=True, exist_ok=True)
             
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(config, f, default_flow_style=False, allow_unicode=True, indent=2)
+                yaml.dump(config, f, Dumper=_YamlDumper,
+                          default_flow_style=False, allow_unicode=True, indent=2)
             logger.info(f"已创建默认配置文件: {self.config_path}")
         except Exception as e:
             logger.error(f"创建配置文件时出错: {e}")
@@ -225,7 +388,8 @@ class MPDToHLSStreamer:
         """保存当前配置到文件"""
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(self.config, f, default_flow_style=False, allow_unicode=True, indent=2)
+                yaml.dump(self.config, f, Dumper=_YamlDumper,
+                          default_flow_style=False, allow_unicode=True, indent=2)
             logger.info(f"配置已保存到: {self.config_path}")
             return True
         except Exception as e:
@@ -270,27 +434,7 @@ class MPDToHLSStreamer:
 
     def parse_kodi_props(self, stream_text: str) -> dict:
         """解析Kodi属性格式的流信息"""
-        lines = stream_text.strip().split('\n')
-        props = {}
-        url = None
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('#KODIPROP:'):
-                # 解析属性
-                prop_part = line[len('#KODIPROP:'):]
-                if '=' in prop_part:
-                    key, value = prop_part.split('=', 1)
-                    props[key] = value
-            elif line.startswith('http'):
-                url = line
-        
-        return {
-            'url': url,
-            'manifest_type': props.get('inputstream.adaptive.manifest_type'),
-            'license_type': props.get('inputstream.adaptive.license_type'),
-            'license_key': props.get('inputstream.adaptive.license_key')
-        }
+        return dict(_parse_kodi_props_cached(stream_text))
 
     async def fetch_mpd(self, url: str, headers: dict = None) -> str:
         """获取MPD清单文件"""
@@ -303,16 +447,7 @@ class MPDToHLSStreamer:
 
     def parse_clearkey_license(self, license_key: str) -> Dict[str, str]:
         """解析ClearKey许可证"""
-        if ':' in license_key:
-            key_id, key = license_key.split(':', 1)
-            # 移除可能的空格和特殊字符
-            key_id = key_id.strip()
-            key = key.strip()
-            return {
-                'key_id': key_id,
-                'key': key
-            }
-        return {}
+        return dict(_parse_clearkey_license_cached(license_key))
 
     async def test_stream_connectivity(self, url: str, timeout: int = 10) -> bool:
         """测试流URL的连接性"""
@@ -333,44 +468,24 @@ class MPDToHLSStreamer:
         if not output:
             return f"进程异常退出 (代码: {return_code})"
         
-        output_lower = output.lower()
-        
-        # 网络连接错误
-        if "connection reset by peer" in output_lower:
-            return "网络连接被重置，可能是源服务器问题或网络不稳定"
-        elif "connection refused" in output_lower:
-            return "连接被拒绝，源服务器可能不可达"
-        elif "timeout" in output_lower or "timed out" in output_lower:
-            return "连接超时，网络延迟过高或源服务器响应慢"
-        elif "403" in output_lower or "forbidden" in output_lower:
-            return "访问被禁止，可能需要认证或IP被封"
-        elif "404" in output_lower or "not found" in output_lower:
-            return "资源不存在，URL可能已失效"
-        elif "500" in output_lower or "internal server error" in output_lower:
-            return "源服务器内部错误"
-        
-        # SSL/TLS错误
-        elif "ssl" in output_lower or "tls" in output_lower:
-            return "SSL/TLS握手失败，可能是证书问题"
-        
-        # 格式/编解码错误
-        elif "invalid data" in output_lower or "corrupt" in output_lower:
-            return "数据损坏或格式不支持"
-        elif "no decoder" in output_lower:
-            return "缺少解码器或格式不支持"
-        
-        # 解密相关错误
-        elif "decryption" in output_lower:
-            return "解密失败，密钥可能不正确"
-        
-        # 输出相关错误
-        elif "permission denied" in output_lower:
-            return "文件权限错误"
-        elif "disk full" in output_lower or "no space" in output_lower:
-            return "磁盘空间不足"
+        # 所有规则出现在文本的任意位置都算命中，取优先级最高的一条
+        best = None
+        for match in _FFMPEG_ERROR_RE.finditer(output):
+            rule = match.lastindex - 1
+            if best is None or rule < best:
+                best = rule
+                if best == 0:
+                    break
+        
+        if best is not None:
+            return _FFMPEG_ERROR_RULES[best][1]
         
         return f"未知错误 (代码: {return_code})"
 
+    def _analyze_ffmpeg_errors(self, rows) -> List[str]:
+        """批量分析 (输出, 返回码) 列表，复用同一个预编译的正则"""
+        return [self._analyze_ffmpeg_error(output, return_code) for output, return_code in rows]
+
     def _should_retry_error(self, error_analysis: str, current_restarts: int) -> bool:
         """判断错误是否应该重试"""
         error_lower = error_analysis.lower()
@@ -471,6 +586,8 @@ class MPDToHLSStreamer:
                 universal_newlines=False  # 二进制模式
             )
             
+            _enlarge_pipe(decrypt_process.stdout.fileno())
+            
             # 启动FFmpeg进程，连接解密进程的输出
             ffmpeg_process = subprocess.Popen(
                 ffmpeg_cmd,
@@ -482,6 +599,10 @@ class MPDToHLSStreamer:
             
             # 关闭解密进程的stdout在FFmpeg进程中，避免管道阻塞
             decrypt_process.stdout.close()
+            
+            # 持续读取两个进程的输出，避免管道写满阻塞且内存有界
+            decrypt_tail = self._start_output_tail(decrypt_process.stderr)
+            ffmpeg_tail = self._start_output_tail(ffmpeg_process.stdout)
 
             # 保存会话信息 - 需要管理两个进程
             self.sessions[stream_id] = {
@@ -492,7 +613,10 @@ class MPDToHLSStreamer:
                 'created_at': time.time(),
                 'status': 'starting',
                 'cmd': ffmpeg_cmd,
+                'cmd_preview': tuple(ffmpeg_cmd[:5]),  # 状态接口只显示命令的前几个参数
                 'decrypt_cmd': decrypt_cmd,
+                'decrypt_output_tail': decrypt_tail,
+                'output_tail': ffmpeg_tail,
                 'restart_count': 0,
                 'method': 'decryption_pipe'
             }
@@ -564,6 +688,9 @@ class MPDToHLSStreamer:
                 bufsize=1  # 行缓冲
             )
 
+            # 持续读取FFmpeg输出，避免管道写满阻塞且内存有界
+            output_tail = self._start_output_tail(process.stdout)
+
             # 保存会话信息
             self.sessions[stream_id] = {
                 'process': process,
@@ -571,6 +698,8 @@ class MPDToHLSStreamer:
                 'created_at': time.time(),
                 'status': 'starting',
                 'cmd': cmd,
+                'cmd_preview': tuple(cmd[:5]),  # 状态接口只显示命令的前几个参数
+                'output_tail': output_tail,
                 'restart_count': 0,
                 'method': 'ffmpeg_direct'
             }
@@ -598,6 +727,27 @@ class MPDToHLSStreamer:
                 del self.active_streams[stream_id]
             raise
 
+    def _start_output_tail(self, stream) -> deque:
+        """后台线程持续读取子进程输出，仅在有界队列中保留最近的若干行"""
+        tail = deque(maxlen=PROCESS_OUTPUT_TAIL_LINES)
+        
+        def _reader():
+            try:
+                for line in stream:
+                    if isinstance(line, bytes):
+                        line = line.decode('utf-8', errors='ignore')
+                    tail.append(line.rstrip('\n'))
+            except (ValueError, OSError):
+                # 管道已关闭
+                pass
+        
+        threading.Thread(target=_reader, daemon=True).start()
+        return tail
+
+    def _read_output_tail(self, session: dict, key: str) -> str:
+        """返回进程退出后保留的最近输出内容"""
+        return '\n'.join(session.get(key, ()))
+
     async def _monitor_ffmpeg_process(self, stream_id: str):
         """监控FFmpeg进程状态"""
         if stream_id not in self.sessions:
@@ -613,14 +763,9 @@ class MPDToHLSStreamer:
             
             # 检查进程状态
             if process.poll() is not None:
-                # 进程已退出，尝试读取输出
-                try:
-                    # 使用非阻塞方式读取输出
-                    stdout = process.stdout.read() if process.stdout else ""
-                    stderr = ""  # stderr已合并到stdout
-                except:
-                    stdout = ""
-                    stderr = ""
+                # 进程已退出，读取保留的最近输出
+                stdout = self._read_output_tail(session, 'output_tail')
+                stderr = ""  # stderr已合并到stdout
                 
                 logger.error(f"FFmpeg进程意外退出 (stream_id: {stream_id})")
                 logger.error(f"返回码: {process.returncode}")
@@ -703,8 +848,7 @@ class MPDToHLSStreamer:
                 
                 if decrypt_status is not None:
                     try:
-                        _, stderr = decrypt_process.communicate(timeout=1)
-                        decrypt_error = stderr.decode('utf-8', errors='ignore') if stderr else ""
+                        decrypt_error = self._read_output_tail(session, 'decrypt_output_tail')
                         error_info.append(f"解密进程退出 (代码: {decrypt_status}): {decrypt_error}")
                         logger.error(f"解密进程退出 - 代码: {decrypt_status}, 错误: {decrypt_error}")
                     except:
@@ -712,7 +856,7 @@ class MPDToHLSStreamer:
                 
                 if ffmpeg_status is not None:
                     try:
-                        stdout = ffmpeg_process.stdout.read() if ffmpeg_process.stdout else ""
+                        stdout = self._read_output_tail(session, 'output_tail')
                         error_info.append(f"FFmpeg进程退出 (代码: {ffmpeg_status}): {stdout}")
                         logger.error(f"FFmpeg进程退出 - 代码: {ffmpeg_status}, 输出: {stdout}")
                     except:
@@ -946,14 +1090,16 @@ class MPDToHLSStreamer:
         if not os.path.exists(segment_path):
             return web.Response(text="段文件不存在", status=404)
         
-        # 返回段文件
-        with open(segment_path, 'rb') as f:
-            content = f.read()
-        
-        return web.Response(
-            body=content,
-            content_type='video/MP2T',
-            headers={'Access-Control-Allow-Origin': '*'}
+        # 返回段文件 - FileResponse使用sendfile零拷贝发送并支持Range请求
+        # 直播段文件名会被循环复用，缓存需每次按Last-Modified重新验证
+        return web.FileResponse(
+            path=segment_path,
+            chunk_size=SEGMENT_CHUNK_SIZE,
+            headers={
+                'Content-Type': 'video/MP2T',
+                'Cache-Control': 'no-cache',
+                'Access-Control-Allow-Origin': '*'
+            }
         )
 
     async def handle_add_stream(self, request):
@@ -985,7 +1131,7 @@ class MPDToHLSStreamer:
             # 保存配置
             self.save_config()
             
-            return web.json_response({
+            return _json_response({
                 'success': True,
                 'stream_id': stream_id,
                 'hls_url': f'/stream/{stream_id}/playlist.m3u8'
@@ -993,7 +1139,7 @@ class MPDToHLSStreamer:
             
         except Exception as e:
             logger.error(f"添加流失败: {e}")
-            return web.json_response({'success': False, 'error': str(e)}, status=400)
+            return _json_response({'success': False, 'error': str(e)}, status=400)
 
     async def handle_update_stream(self, request):
         """更新流配置"""
@@ -1018,13 +1164,13 @@ class MPDToHLSStreamer:
                     # 保存配置
                     self.save_config()
                     
-                    return web.json_response({'success': True})
+                    return _json_response({'success': True})
             
-            return web.json_response({'success': False, 'error': '流不存在'}, status=404)
+            return _json_response({'success': False, 'error': '流不存在'}, status=404)
             
         except Exception as e:
             logger.error(f"更新流失败: {e}")
-            return web.json_response({'success': False, 'error': str(e)}, status=400)
+            return _json_response({'success': False, 'error': str(e)}, status=400)
 
     async def handle_delete_stream(self, request):
         """删除流配置"""
@@ -1047,13 +1193,13 @@ class MPDToHLSStreamer:
                 if stream_id in self.active_streams:
                     del self.active_streams[stream_id]
                 
-                return web.json_response({'success': True})
+                return _json_response({'success': True})
             else:
-                return web.json_response({'success': False, 'error': '流不存在'}, status=404)
+                return _json_response({'success': False, 'error': '流不存在'}, status=404)
                 
         except Exception as e:
             logger.error(f"删除流失败: {e}")
-            return web.json_response({'success': False, 'error': str(e)}, status=400)
+            return _json_response({'success': False, 'error': str(e)}, status=400)
 
     async def handle_start_stream(self, request):
         """启动流"""
@@ -1067,14 +1213,14 @@ class MPDToHLSStreamer:
                 break
         
         if not stream_config:
-            return web.json_response({'success': False, 'error': '流不存在'}, status=404)
+            return _json_response({'success': False, 'error': '流不存在'}, status=404)
         
         if not stream_config.get('enabled', True):
-            return web.json_response({'success': False, 'error': '流已被禁用'}, status=400)
+            return _json_response({'success': False, 'error': '流已被禁用'}, status=400)
         
         # 检查是否已经在运行
         if stream_id in self.sessions:
-            return web.json_response({'success': False, 'error': '流已在运行'}, status=400)
+            return _json_response({'success': False, 'error': '流已在运行'}, status=400)
         
         try:
             # 启动流
@@ -1084,7 +1230,7 @@ class MPDToHLSStreamer:
                 stream_config.get('license_key')
             )
             
-            return web.json_response({
+            return _json_response({
                 'success': True,
                 'message': '流启动成功',
                 'hls_url': f'/stream/{stream_id}/playlist.m3u8'
@@ -1092,14 +1238,14 @@ class MPDToHLSStreamer:
             
         except Exception as e:
             logger.error(f"启动流失败: {e}")
-            return web.json_response({'success': False, 'error': str(e)}, status=500)
+            return _json_response({'success': False, 'error': str(e)}, status=500)
 
     async def handle_stop_stream(self, request):
         """停止流"""
         stream_id = request.match_info['stream_id']
         
         if stream_id not in self.sessions:
-            return web.json_response({'success': False, 'error': '流未运行'}, status=400)
+            return _json_response({'success': False, 'error': '流未运行'}, status=400)
         
         try:
             # 停止流
@@ -1109,14 +1255,14 @@ class MPDToHLSStreamer:
             if stream_id in self.active_streams:
                 del self.active_streams[stream_id]
             
-            return web.json_response({
+            return _json_response({
                 'success': True,
                 'message': '流停止成功'
             })
             
         except Exception as e:
             logger.error(f"停止流失败: {e}")
-            return web.json_response({'success': False, 'error': str(e)}, status=500)
+            return _json_response({'success': False, 'error': str(e)}, status=500)
 
     async def handle_get_stream_status(self, request):
         """获取流状态"""
@@ -1130,10 +1276,12 @@ class MPDToHLSStreamer:
                 break
         
         if not stream_config:
-            return web.json_response({'success': False, 'error': '流不存在'}, status=404)
+            return _json_response({'success': False, 'error': '流不存在'}, status=404)
         
+        now = time.time()
         session_info = self.sessions.get(stream_id, {})
         active_info = self.active_streams.get(stream_id, {})
+        started_at = active_info.get('started_at')
         
         # 检查FFmpeg进程状态
         process_status = 'stopped'
@@ -1145,7 +1293,7 @@ class MPDToHLSStreamer:
                 process_status = 'running'
                 process_info = {
                     'pid': process.pid,
-                    'cmd': session_info.get('cmd', [])[:5],  # 只显示命令的前几个参数
+                    'cmd': session_info.get('cmd_preview', ()),
                 }
             else:
                 process_status = 'exited'
@@ -1177,8 +1325,8 @@ class MPDToHLSStreamer:
             'status': active_info.get('status', 'stopped'),
             'process_status': process_status,
             'process_info': process_info,
-            'started_at': active_info.get('started_at'),
-            'uptime': time.time() - active_info.get('started_at', time.time()) if active_info.get('started_at') else 0,
+            'started_at': started_at,
+            'uptime': now - started_at if started_at else 0,
             'hls_url': f'/stream/{stream_id}/playlist.m3u8' if stream_id in self.sessions else None,
             'output_info': {
                 'playlist_exists': playlist_exists,
@@ -1187,7 +1335,7 @@ class MPDToHLSStreamer:
             }
         }
         
-        return web.json_response(status)
+        return _json_response(status)
     
     async def handle_test_stream(self, request):
         """测试流URL是否可访问"""
@@ -1201,7 +1349,7 @@ class MPDToHLSStreamer:
                 break
         
         if not stream_config:
-            return web.json_response({'success': False, 'error': '流不存在'}, status=404)
+            return _json_response({'success': False, 'error': '流不存在'}, status=404)
         
         try:
             # 测试MPD URL访问
@@ -1222,10 +1370,10 @@ class MPDToHLSStreamer:
                         test_result['is_mpd'] = 'MPD' in content_preview[:1000]
                         test_result['content_preview'] = content_preview[:200] + '...' if len(content_preview) > 200 else content_preview
                     
-                    return web.json_response({'success': True, 'test_result': test_result})
+                    return _json_response({'success': True, 'test_result': test_result})
                     
         except Exception as e:
-            return web.json_response({
+            return _json_response({
                 'success': False, 
                 'error': f'测试失败: {str(e)}',
                 'test_result': {
@@ -1252,11 +1400,11 @@ class MPDToHLSStreamer:
                 'enabled': stream.get('enabled', True)
             })
         
-        return web.json_response({'streams': streams})
+        return _json_response({'streams': streams})
 
     async def handle_health_check(self, request):
         """健康检查"""
-        return web.json_response({
+        return _json_response({
             'status': 'healthy',
             'active_streams': len(self.sessions),
             'timestamp': time.time()
@@ -1352,53 +1500,10 @@ class MPDToHLSStreamer:
                     return web.Response(text=content, content_type='text/html')
                 else:
                     # 如果demo.html不存在，返回简单的欢迎页面
-                    welcome_html = '''
-                    <!DOCTYPE html>
-                    <html>
-                    <head>
-                        <title>MPD流媒体服务</title>
-                        <meta charset="utf-8">
-                        <style>
-                            body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
-                            .container { background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
-                            h1 { color: #333; }
-                            .status { color: #28a745; font-weight: bold; }
-                            ul { list-style: none; padding: 0; }
-                            li { margin: 10px 0; }
-                            a { color: #007bff; text-decoration: none; padding: 8px 15px; border: 1px solid #007bff; border-radius: 5px; display: inline-block; }
-                            a:hover { background: #007bff; color: white; }
-                        </style>
-                    </head>
-                    <body>
-                        <div class="container">
-                            <h1>🎬 MPD到HLS流媒体转换服务</h1>
-                            <p class="status">✅ 服务运行正常！</p>
-                            <p>通过反向代理访问成功</p>
-                            <h3>📋 可用功能:</h3>
-                            <ul>
-                                <li><a href="/index.html">📊 完整管理界面</a></li>
-                                <li><a href="/demo.html">🎬 演示页面</a></li>
-                                <li><a href="/health">❤️ 健康检查</a></li>
-                                <li><a href="/streams">🔗 API接口</a></li>
-                            </ul>
-                        </div>
-                    </body>
-                    </html>
-                    '''
-                    return web.Response(text=welcome_html, content_type='text/html')
+                    return web.Response(body=_WELCOME_HTML_BYTES, content_type='text/html', charset='utf-8')
             except Exception as e:
                 logger.error(f"处理根路径请求时出错: {e}")
-                error_html = f'''
-                <!DOCTYPE html>
-                <html>
-                <head><title>服务错误</title></head>
-                <body>
-                    <h1>服务暂时不可用</h1>
-                    <p>错误信息: {str(e)}</p>
-                    <p><a href="/health">检查服务健康状态</a></p>
-                </body>
-                </html>
-                '''
+                error_html = _ERROR_HTML_TEMPLATE.substitute(error=str(e))
                 return web.Response(text=error_html, status=500, content_type='text/html')
         
         # 先添加根路径处理器
@@ -1454,6 +1559,15 @@ class MPDToHLSStreamer:
 
     def run(self):
         """运行服务器"""
+        # 可用时使用uvloop替换默认事件循环（Windows等平台不可用则保持asyncio默认）
+        try:
+            import uvloop
+            # uvloop.install()自Python 3.12起已弃用，直接设置事件循环策略
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            logger.info("已启用uvloop事件循环")
+        except ImportError:
+            pass
+        
         app = self.create_app()
         
         logger.info(f"启动MPD转HLS流媒体服务器...")
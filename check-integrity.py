@@ -10,36 +10,101 @@ import sys
 import yaml
 import json
 import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
-def check_file_exists(filepath, description):
+# 优先使用libyaml的C实现解析YAML
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# 扫描项目时跳过的目录
+SCAN_EXCLUDED_DIRS = {'.git', '__pycache__', 'node_modules', '.pytest_cache'}
+
+def scan_project(root='.'):
+    """一次遍历项目目录，返回 {相对路径: 是否为目录} 映射"""
+    existing = {}
+    pending = [root]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.name in SCAN_EXCLUDED_DIRS:
+                        continue
+                    rel_path = os.path.relpath(entry.path, root).replace(os.sep, '/')
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    existing[rel_path] = is_dir
+                    if is_dir:
+                        pending.append(entry.path)
+        except OSError:
+            continue
+    return existing
+
+def check_file_exists(filepath, description, existing):
     """检查文件是否存在"""
-    if os.path.exists(filepath):
+    if filepath in existing:
         print(f"✅ {description}: {filepath}")
         return True
     else:
         print(f"❌ {description}缺失: {filepath}")
         return False
 
-def check_directory_exists(dirpath, description):
+def check_directory_exists(dirpath, description, existing):
     """检查目录是否存在"""
-    if os.path.isdir(dirpath):
+    if existing.get(dirpath):
         print(f"✅ {description}: {dirpath}")
         return True
     else:
         print(f"❌ {description}缺失: {dirpath}")
         return False
 
-def check_yaml_syntax(filepath):
-    """检查YAML文件语法"""
+def _yaml_worker(filepath):
+    """解析YAML文件，返回 (路径, 是否成功, 错误信息)"""
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            yaml.safe_load(f)
-        print(f"✅ YAML语法正确: {filepath}")
-        return True
+            yaml.load(f, Loader=_YamlLoader)
+        return filepath, True, None
     except Exception as e:
-        print(f"❌ YAML语法错误 {filepath}: {e}")
-        return False
+        return filepath, False, str(e)
+
+def _compile_worker(filepath):
+    """编译Python文件，返回 (路径, 是否成功, 错误信息)"""
+    try:
+        # compile()直接接受bytes并按PEP 263处理源码编码声明
+        with open(filepath, 'rb') as f:
+            compile(f.read(), filepath, 'exec')
+        return filepath, True, None
+    except Exception as e:
+        return filepath, False, str(e)
+
+def run_syntax_checks(python_files, yaml_files):
+    """并发执行语法检查：Python编译使用进程池，YAML解析使用线程池"""
+    results = {}
+    with ThreadPoolExecutor() as yaml_pool:
+        yaml_futures = [yaml_pool.submit(_yaml_worker, path) for path in yaml_files]
+        try:
+            with ProcessPoolExecutor() as compile_pool:
+                for path, ok, err in compile_pool.map(_compile_worker, python_files):
+                    results[path] = (ok, err)
+        except (OSError, NotImplementedError):
+            # 受限环境下无法创建子进程时退回串行编译
+            for path, ok, err in map(_compile_worker, python_files):
+                results[path] = (ok, err)
+        for future in yaml_futures:
+            path, ok, err = future.result()
+            results[path] = (ok, err)
+    return results
+
+def check_yaml_syntax(filepath, results):
+    """检查YAML文件语法"""
+    ok, err = results[filepath]
+    if ok:
+        print(f"✅ YAML语法正确: {filepath}")
+    else:
+        print(f"❌ YAML语法错误 {filepath}: {err}")
+    return ok
 
 def check_json_syntax(filepath):
     """检查JSON文件语法"""
@@ -52,24 +117,20 @@ def check_json_syntax(filepath):
         print(f"❌ JSON语法错误 {filepath}: {e}")
         return False
 
-def check_python_syntax(filepath):
+def check_python_syntax(filepath, results):
     """检查Python文件语法"""
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            compile(f.read(), filepath, 'exec')
+    ok, err = results[filepath]
+    if ok:
         print(f"✅ Python语法正确: {filepath}")
-        return True
-    except Exception as e:
-        print(f"❌ Python语法错误 {filepath}: {e}")
-        return False
+    else:
+        print(f"❌ Python语法错误 {filepath}: {err}")
+    return ok
 
 def main():
     print("🔍 开始项目完整性检查...\n")
     
     issues = []
     
-    # 检查核心Python文件
-    print("📁 检查核心Python文件:")
     core_files = [
         ("app.py", "主应用服务器"),
         ("stream_manager.py", "流管理器"),
@@ -78,54 +139,23 @@ def main():
         ("example.py", "示例代码"),
         ("quick_start.py", "快速启动脚本")
     ]
-    
-    for filepath, desc in core_files:
-        if check_file_exists(filepath, desc):
-            if not check_python_syntax(filepath):
-                issues.append(f"Python语法错误: {filepath}")
-    
-    print("\n📁 检查配置文件:")
-    # 检查配置文件
     config_files = [
         ("config.yaml", "主配置文件"),
         ("config.example.yaml", "示例配置文件"),
         ("requirements.txt", "Python依赖"),
         ("nginx.conf", "Nginx配置")
     ]
-    
-    for filepath, desc in config_files:
-        if check_file_exists(filepath, desc):
-            if filepath.endswith('.yaml'):
-                if not check_yaml_syntax(filepath):
-                    issues.append(f"YAML语法错误: {filepath}")
-    
-    print("\n📁 检查Docker文件:")
-    # 检查Docker文件
     docker_files = [
         ("Dockerfile", "Docker镜像文件"),
         ("docker-compose.yml", "Docker Compose开发"),
         ("docker-compose.prod.yml", "Docker Compose生产"),
         ("entrypoint.sh", "容器入口脚本")
     ]
-    
-    for filepath, desc in docker_files:
-        check_file_exists(filepath, desc)
-    
-    print("\n📁 检查测试文件:")
-    # 检查测试文件
     test_files = [
         ("tests/test_app.py", "应用测试"),
         ("test_webui.py", "Web UI测试"),
         ("test_auto_config.py", "自动配置测试")
     ]
-    
-    for filepath, desc in test_files:
-        if check_file_exists(filepath, desc):
-            if not check_python_syntax(filepath):
-                issues.append(f"Python语法错误: {filepath}")
-    
-    print("\n📁 检查文档文件:")
-    # 检查文档文件
     doc_files = [
         ("README.md", "项目说明"),
         ("SECURITY.md", "安全文档"),
@@ -134,24 +164,10 @@ def main():
         ("DEPLOYMENT_CHECKLIST.md", "部署清单"),
         ("DOCKER_HUB_SETUP.md", "Docker Hub设置")
     ]
-    
-    for filepath, desc in doc_files:
-        check_file_exists(filepath, desc)
-    
-    print("\n📁 检查CI/CD文件:")
-    # 检查GitHub Actions
     github_files = [
         (".github/workflows/ci.yml", "CI工作流"),
         (".github/workflows/docker-build.yml", "Docker构建工作流")
     ]
-    
-    for filepath, desc in github_files:
-        if check_file_exists(filepath, desc):
-            if not check_yaml_syntax(filepath):
-                issues.append(f"YAML语法错误: {filepath}")
-    
-    print("\n📁 检查启动脚本:")
-    # 检查启动脚本
     script_files = [
         ("start.sh", "Linux启动脚本"),
         ("start.bat", "Windows启动脚本"),
@@ -160,12 +176,6 @@ def main():
         ("release.sh", "发布脚本"),
         ("check-security.sh", "安全检查脚本")
     ]
-    
-    for filepath, desc in script_files:
-        check_file_exists(filepath, desc)
-    
-    print("\n📁 检查目录结构:")
-    # 检查目录
     directories = [
         (".github", "GitHub配置目录"),
         (".github/workflows", "GitHub Actions目录"),
@@ -173,8 +183,61 @@ def main():
         ("static", "静态文件目录")
     ]
     
+    # 一次遍历获取全部已存在路径，并提前并发完成所有语法检查
+    existing = scan_project()
+    python_files = [path for path, _ in core_files + test_files if path in existing]
+    yaml_files = [path for path, _ in config_files + github_files
+                  if path.endswith(('.yaml', '.yml')) and path in existing]
+    results = run_syntax_checks(python_files, yaml_files)
+    
+    # 检查核心Python文件
+    print("📁 检查核心Python文件:")
+    for filepath, desc in core_files:
+        if check_file_exists(filepath, desc, existing):
+            if not check_python_syntax(filepath, results):
+                issues.append(f"Python语法错误: {filepath}")
+    
+    print("\n📁 检查配置文件:")
+    # 检查配置文件
+    for filepath, desc in config_files:
+        if check_file_exists(filepath, desc, existing):
+            if filepath.endswith('.yaml'):
+                if not check_yaml_syntax(filepath, results):
+                    issues.append(f"YAML语法错误: {filepath}")
+    
+    print("\n📁 检查Docker文件:")
+    # 检查Docker文件
+    for filepath, desc in docker_files:
+        check_file_exists(filepath, desc, existing)
+    
+    print("\n📁 检查测试文件:")
+    # 检查测试文件
+    for filepath, desc in test_files:
+        if check_file_exists(filepath, desc, existing):
+            if not check_python_syntax(filepath, results):
+                issues.append(f"Python语法错误: {filepath}")
+    
+    print("\n📁 检查文档文件:")
+    # 检查文档文件
+    for filepath, desc in doc_files:
+        check_file_exists(filepath, desc, existing)
+    
+    print("\n📁 检查CI/CD文件:")
+    # 检查GitHub Actions
+    for filepath, desc in github_files:
+        if check_file_exists(filepath, desc, existing):
+            if not check_yaml_syntax(filepath, results):
+                issues.append(f"YAML语法错误: {filepath}")
+    
+    print("\n📁 检查启动脚本:")
+    # 检查启动脚本
+    for filepath, desc in script_files:
+        check_file_exists(filepath, desc, existing)
+    
+    print("\n📁 检查目录结构:")
+    # 检查目录
     for dirpath, desc in directories:
-        check_directory_exists(dirpath, desc)
+        check_directory_exists(dirpath, desc, existing)
     
     print("\n🔍 安全性检查:")
     # 运行安全检查
@@ -9,26 +9,471 @@ import sys
 import asyncio
 import subprocess
 import tempfile
+import shutil
 import logging
 import json
-from pathlib import Path
-from typing import Dict, Optional, List
+import hashlib
+from typing import Dict, Optional, List, Tuple
 import requests
-import xml.etree.ElementTree as ET
-from urllib.parse import urljoin, urlparse
-import base64
-import binascii
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import io
+from urllib.parse import urljoin
+import re
+import struct
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+# 优先使用lxml的C实现解析MPD，只为需要的标签产生事件
+try:
+    from lxml import etree as _etree
+    _MPD_ITERPARSE_OPTIONS = {
+        'tag': ('{*}AdaptationSet', '{*}ContentProtection', '{*}Representation', '{*}SegmentTemplate'),
+    }
+except ImportError:
+    import xml.etree.ElementTree as _etree
+    _MPD_ITERPARSE_OPTIONS = {}
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = None
 
 logger = logging.getLogger(__name__)
 
+# 进程内缓存的已解析MPD数量上限，0表示禁用
+MPD_CACHE_MAX = int(os.environ.get('MPDSTREAMING_MPD_CACHE_MAX', '128'))
+# ffprobe编码探测结果缓存：(路径, 大小, 修改时间) -> (视频编码, 音频编码)，只缓存本地文件
+_codec_probe_cache: 'OrderedDict[tuple, Tuple[Optional[str], Optional[str]]]' = OrderedDict()
+# 编码探测缓存条目上限
+CODEC_PROBE_CACHE_MAX = 64
+# ffprobe探测超时（秒），远程源无响应时放弃探测并重新编码
+CODEC_PROBE_TIMEOUT = 30
+# 已解析MPD的磁盘缓存目录
+MPD_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'mpdstream')
+
+# 下载与解密流水线中预先下载的segment数量上限
+SEGMENT_QUEUE_SIZE = 8
+# 同时运行的外部解密进程(mp4decrypt/FFmpeg)数量
+EXTERNAL_DECRYPT_WORKERS = os.cpu_count() or 1
+# 同时进行的segment下载数量
+SEGMENT_DOWNLOAD_CONCURRENCY = 8
+# 每个主机保持的长连接数量上限
+HTTP_POOL_MAXSIZE = 32
+# segment文件写入缓冲区大小
+SEGMENT_WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+# segment下载时每次读取的块大小
+SEGMENT_CHUNK_SIZE = 256 * 1024
+
+# 需要向下遍历的MP4容器box，值为子box相对负载起始的偏移
+_MP4_CONTAINER_BOXES = {
+    b'moov': 0, b'trak': 0, b'mdia': 0, b'minf': 0, b'stbl': 0,
+    b'sinf': 0, b'schi': 0, b'moof': 0, b'traf': 0,
+    b'stsd': 8,   # FullBox头 + entry_count
+    b'encv': 78,  # VisualSampleEntry固定字段
+    b'enca': 28,  # AudioSampleEntry固定字段
+}
+
+def _iter_boxes(data, start: int = 0, end: int = None):
+    """遍历同一层级的MP4 box，产出 (类型, box起始, 负载起始, box结束)"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                break
+            size = struct.unpack_from('>Q', data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            break
+        yield box_type, pos, pos + header, pos + size
+        pos += size
+
+def _walk_boxes(data, start: int = 0, end: int = None):
+    """深度优先遍历MP4 box树（只进入已知容器）"""
+    for box_type, box_start, payload, box_end in _iter_boxes(data, start, end):
+        yield box_type, box_start, payload, box_end
+        child_offset = _MP4_CONTAINER_BOXES.get(box_type)
+        if child_offset is not None:
+            yield from _walk_boxes(data, payload + child_offset, box_end)
+
+# SegmentTemplate中的$标识符$及可选的printf宽度格式，$$表示字面量$
+_TEMPLATE_IDENTIFIER_RE = re.compile(r'\$(RepresentationID|Number|Bandwidth|Time)(?:%0(\d+)d)?\$|\$\$')
+
+@lru_cache(maxsize=256)
+def _compile_segment_template(template: str, representation_id: str = '',
+                              bandwidth: str = '') -> str:
+    """把SegmentTemplate编译为str.format格式串
+    
+    $RepresentationID$和$Bandwidth$在编译时直接代入，$Number$/$Time$保留为
+    format字段（支持%0Nd宽度），每个segment只需一次format调用。
+    """
+    static_values = {'RepresentationID': representation_id, 'Bandwidth': bandwidth}
+    parts = []
+    pos = 0
+    for match in _TEMPLATE_IDENTIFIER_RE.finditer(template):
+        parts.append(template[pos:match.start()].replace('{', '{{').replace('}', '}}'))
+        identifier, width = match.groups()
+        if identifier is None:
+            parts.append('$')
+        elif identifier in static_values:
+            value = str(static_values[identifier])
+            if width and value.isdigit():
+                value = value.zfill(int(width))
+            parts.append(value.replace('{', '{{').replace('}', '}}'))
+        else:
+            parts.append(f'{{{identifier}:0{width}d}}' if width else f'{{{identifier}}}')
+        pos = match.end()
+    parts.append(template[pos:].replace('{', '{{').replace('}', '}}'))
+    return ''.join(parts)
+
+@lru_cache(maxsize=32)
+def _hex_to_bytes(value: str) -> bytes:
+    """十六进制密钥/KID转bytes，兼容带连字符的UUID写法"""
+    return bytes.fromhex(value.replace('-', '') if '-' in value else value)
+
+class CencSegmentDecryptor:
+    """MP4 CENC分片进程内解密器
+
+    解析moof/traf中的tfhd、trun和senc，按样本IV和子样本区间只解密
+    加密字节：'cenc'方案使用AES-CTR，'cbcs'方案使用带pattern的AES-CBC。
+    无法解析的分片返回None，由调用方回退到mp4decrypt。
+    """
+
+    SUPPORTED_SCHEMES = ('cenc', 'cbcs')
+
+    def __init__(self, key: bytes, scheme: str = 'cenc', iv_size: int = 8,
+                 constant_iv: bytes = None, crypt_byte_block: int = 0,
+                 skip_byte_block: int = 0):
+        self.key = key
+        self.scheme = scheme
+        self.iv_size = iv_size
+        self.constant_iv = constant_iv
+        self.crypt_byte_block = crypt_byte_block
+        self.skip_byte_block = skip_byte_block
+        # 密钥校验和算法对象只创建一次，所有样本的解密上下文共用
+        self._algorithm = algorithms.AES(key) if Cipher is not None else None
+
+    @classmethod
+    def from_init_segment(cls, key: bytes, init_data: bytes) -> 'CencSegmentDecryptor':
+        """从初始化分片的schm/tenc读取加密方案、IV长度和加密pattern"""
+        params = {}
+        for box_type, _, payload, box_end in _walk_boxes(init_data):
+            if box_type == b'schm' and 'scheme' not in params:
+                params['scheme'] = init_data[payload + 4:payload + 8].decode('ascii', errors='ignore')
+            elif box_type == b'tenc' and 'iv_size' not in params:
+                version = init_data[payload]
+                pattern = init_data[payload + 5]
+                if version > 0:
+                    params['crypt_byte_block'] = pattern >> 4
+                    params['skip_byte_block'] = pattern & 0x0F
+                is_protected = init_data[payload + 6]
+                params['iv_size'] = init_data[payload + 7]
+                pos = payload + 24  # 跳过default_KID
+                if is_protected and params['iv_size'] == 0 and pos < box_end:
+                    iv_len = init_data[pos]
+                    params['constant_iv'] = bytes(init_data[pos + 1:pos + 1 + iv_len])
+        return cls(key, **params)
+
+    def decrypt(self, data: bytes) -> Optional[bytes]:
+        """解密一个媒体分片(moof+mdat)，无法识别加密信息时返回None"""
+        buffer = bytearray(data)
+        return bytes(buffer) if self.decrypt_into(buffer) else None
+
+    def decrypt_into(self, buffer: bytearray) -> bool:
+        """原地解密一个媒体分片，返回False时缓冲区内容不可用"""
+        if Cipher is None or self.scheme not in self.SUPPORTED_SCHEMES:
+            return False
+
+        view = memoryview(buffer)
+        decrypted = False
+        try:
+            for box_type, moof_start, payload, moof_end in _iter_boxes(buffer):
+                if box_type != b'moof':
+                    continue
+                for traf_type, _, traf_payload, traf_end in _iter_boxes(buffer, payload, moof_end):
+                    if traf_type == b'traf' and self._decrypt_traf(
+                            view, moof_start, moof_end, traf_payload, traf_end):
+                        decrypted = True
+        except (struct.error, IndexError, ValueError) as e:
+            logger.warning("CENC分片解析失败: %s", e)
+            return False
+        finally:
+            view.release()
+
+        return decrypted
+
+    def _decrypt_traf(self, data: memoryview, moof_start: int, moof_end: int,
+                      traf_start: int, traf_end: int) -> bool:
+        """解密一个traf描述的全部样本"""
+        tfhd = senc = None
+        truns = []
+        for box_type, _, payload, box_end in _iter_boxes(data, traf_start, traf_end):
+            if box_type == b'tfhd':
+                tfhd = payload
+            elif box_type == b'trun':
+                truns.append(payload)
+            elif box_type == b'senc':
+                senc = (payload, box_end)
+        if tfhd is None or senc is None or not truns:
+            return False
+
+        base_offset, default_size = self._parse_tfhd(data, tfhd, moof_start)
+        samples = []  # (样本偏移, 样本大小)
+        next_offset = None
+        for trun in truns:
+            offset, sizes = self._parse_trun(data, trun, default_size)
+            if offset is None:
+                offset = next_offset if next_offset is not None else self._mdat_payload(data, moof_end)
+            else:
+                offset += base_offset
+            for size in sizes:
+                samples.append((offset, size))
+                offset += size
+            next_offset = offset
+
+        entries = self._parse_senc(data, senc[0], senc[1], len(samples))
+        if entries is None:
+            return False
+
+        # update_into的输出缓冲区需比输入多留一个块，整个traf共用一块
+        scratch = memoryview(bytearray(max((size for _, size in samples), default=0) + 16))
+        for (offset, size), (iv, subsamples) in zip(samples, entries):
+            if offset + size > len(data):
+                raise ValueError("样本超出分片范围")
+            if self.scheme == 'cenc':
+                self._decrypt_sample_ctr(data, scratch, offset, size, iv, subsamples)
+            else:
+                self._decrypt_sample_cbcs(data, scratch, offset, size, iv, subsamples)
+        return True
+
+    @staticmethod
+    def _parse_tfhd(data, pos: int, moof_start: int) -> tuple:
+        """返回 (样本数据基准偏移, 默认样本大小)"""
+        flags = int.from_bytes(data[pos + 1:pos + 4], 'big')
+        pos += 8  # version/flags + track_ID
+        base_offset = moof_start
+        if flags & 0x01:
+            base_offset = struct.unpack_from('>Q', data, pos)[0]
+            pos += 8
+        if flags & 0x02:
+            pos += 4
+        if flags & 0x08:
+            pos += 4
+        default_size = None
+        if flags & 0x10:
+            default_size = struct.unpack_from('>I', data, pos)[0]
+        return base_offset, default_size
+
+    @staticmethod
+    def _parse_trun(data, pos: int, default_size: Optional[int]) -> tuple:
+        """返回 (data_offset或None, 样本大小列表)"""
+        flags = int.from_bytes(data[pos + 1:pos + 4], 'big')
+        sample_count = struct.unpack_from('>I', data, pos + 4)[0]
+        pos += 8
+        data_offset = None
+        if flags & 0x01:
+            data_offset = struct.unpack_from('>i', data, pos)[0]
+            pos += 4
+        if flags & 0x04:
+            pos += 4
+        size_field = None
+        field_count = 0
+        for bit in (0x100, 0x200, 0x400, 0x800):
+            if flags & bit:
+                if bit == 0x200:
+                    size_field = field_count
+                field_count += 1
+        if size_field is None:
+            if default_size is None:
+                raise ValueError("缺少样本大小信息")
+            return data_offset, [default_size] * sample_count
+        sizes = [
+            struct.unpack_from('>I', data, pos + (i * field_count + size_field) * 4)[0]
+            for i in range(sample_count)
+        ]
+        return data_offset, sizes
+
+    @staticmethod
+    def _mdat_payload(data, moof_end: int) -> int:
+        """moof之后第一个mdat的负载起始位置"""
+        for box_type, _, payload, _ in _iter_boxes(data, moof_end):
+            if box_type == b'mdat':
+                return payload
+        raise ValueError("找不到mdat")
+
+    def _parse_senc(self, data, start: int, end: int, sample_count: int) -> Optional[list]:
+        """解析senc，返回每个样本的 (IV, [(明文字节数, 密文字节数), ...])"""
+        flags = int.from_bytes(data[start + 1:start + 4], 'big')
+        count = struct.unpack_from('>I', data, start + 4)[0]
+        if count != sample_count:
+            return None
+
+        # 初始化分片缺失时IV长度未知，按box长度推断
+        candidates = [self.iv_size] + [size for size in (8, 16, 0) if size != self.iv_size]
+        for iv_size in candidates:
+            entries = self._parse_senc_entries(data, start + 8, end, count, iv_size, flags & 0x02)
+            if entries is not None:
+                return entries
+        return None
+
+    def _parse_senc_entries(self, data, pos: int, end: int, count: int,
+                            iv_size: int, has_subsamples: int) -> Optional[list]:
+        if iv_size == 0 and not self.constant_iv:
+            return None
+        if not has_subsamples:
+            # 定长记录，直接按IV长度批量解包
+            if pos + count * iv_size != end:
+                return None
+            if not iv_size:
+                return [(self.constant_iv, [])] * count
+            return [(iv, []) for iv, in struct.iter_unpack(f'{iv_size}s', data[pos:end])]
+
+        entries = []
+        for _ in range(count):
+            if pos + iv_size + 2 > end:
+                return None
+            iv = bytes(data[pos:pos + iv_size]) if iv_size else self.constant_iv
+            pos += iv_size
+            subsample_count = struct.unpack_from('>H', data, pos)[0]
+            pos += 2
+            subsample_end = pos + subsample_count * 6
+            if subsample_end > end:
+                return None
+            entries.append((iv, list(struct.iter_unpack('>HI', data[pos:subsample_end]))))
+            pos = subsample_end
+        return entries if pos == end else None
+
+    @staticmethod
+    def _encrypted_ranges(offset: int, size: int, subsamples: list):
+        """产出样本中每个加密区间的 (起始位置, 长度)"""
+        if not subsamples:
+            yield offset, size
+            return
+        pos = offset
+        for clear_bytes, encrypted_bytes in subsamples:
+            pos += clear_bytes
+            yield pos, encrypted_bytes
+            pos += encrypted_bytes
+
+    def _decrypt_sample_ctr(self, data: memoryview, scratch: memoryview, offset: int,
+                            size: int, iv: bytes, subsamples: list):
+        """cenc: 每个样本一个AES-CTR计数器，明文区间不消耗密钥流"""
+        counter = iv + bytes(16 - len(iv))
+        decryptor = Cipher(self._algorithm, modes.CTR(counter)).decryptor()
+        ranges = list(self._encrypted_ranges(offset, size, subsamples))
+        if len(ranges) == 1:
+            pos, length = ranges[0]
+            decryptor.update_into(data[pos:pos + length], scratch)
+            data[pos:pos + length] = scratch[:length]
+            return
+        # 密钥流在子样本间连续，拼接全部密文区间后一次update，再按区间写回
+        decryptor.update_into(b''.join(data[pos:pos + length] for pos, length in ranges), scratch)
+        start = 0
+        for pos, length in ranges:
+            data[pos:pos + length] = scratch[start:start + length]
+            start += length
+
+    def _decrypt_sample_cbcs(self, data: memoryview, scratch: memoryview, offset: int,
+                             size: int, iv: bytes, subsamples: list):
+        """cbcs: 每个子样本重新开始CBC链，按crypt/skip pattern解密整块"""
+        iv = iv + bytes(16 - len(iv))
+        crypt = self.crypt_byte_block
+        skip = self.skip_byte_block
+        if crypt == 0 and skip == 0:
+            crypt = 1
+
+        for pos, remaining in self._encrypted_ranges(offset, size, subsamples):
+            decryptor = Cipher(self._algorithm, modes.CBC(iv)).decryptor()
+            while remaining >= 16:
+                block_bytes = min(crypt * 16, remaining - remaining % 16)
+                n = decryptor.update_into(data[pos:pos + block_bytes], scratch)
+                data[pos:pos + n] = scratch[:n]
+                pos += block_bytes
+                remaining -= block_bytes
+                skip_bytes = min(skip * 16, remaining)
+                pos += skip_bytes
+                remaining -= skip_bytes
+
+def _is_nonempty_file(path: str) -> bool:
+    """一次stat判断文件存在且非空"""
+    try:
+        return os.stat(path).st_size > 0
+    except OSError:
+        return False
+
+def _decrypt_file_worker(cenc_decryptor: CencSegmentDecryptor,
+                         encrypted_file: str, decrypted_file: str) -> bool:
+    """读取加密分片并在进程内解密写出（在线程池中运行）"""
+    with open(encrypted_file, 'rb') as f:
+        buffer = bytearray(os.fstat(f.fileno()).st_size)
+        del buffer[f.readinto(buffer):]
+    if not cenc_decryptor.decrypt_into(buffer):
+        return False
+    with open(decrypted_file, 'wb') as f:
+        f.write(buffer)
+    return True
+
+def _mpd_cache_path(mpd_url: str) -> str:
+    """MPD解析结果的缓存文件路径（按URL哈希）"""
+    digest = hashlib.blake2b(mpd_url.encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(MPD_CACHE_DIR, f'{digest}.json')
+
+def _read_mpd_cache(cache_file: str) -> Optional[Dict]:
+    """读取MPD缓存，不存在或损坏时返回None"""
+    try:
+        with open(cache_file, 'rb') as f:
+            data = f.read()
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    except (OSError, ValueError):
+        return None
+
+def _write_mpd_cache(cache_file: str, entry: Dict):
+    """原子写入MPD缓存，失败时忽略"""
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        data = orjson.dumps(entry) if orjson is not None else json.dumps(entry).encode('utf-8')
+        temp_file = f'{cache_file}.{os.getpid()}.tmp'
+        with open(temp_file, 'wb') as f:
+            f.write(data)
+        os.replace(temp_file, cache_file)
+    except (OSError, TypeError) as e:
+        logger.debug("写入MPD缓存失败: %s", e)
+
 class DashClearKeyDecryptor:
     """DASH ClearKey解密器"""
     
+    # 进程内共享的MPD解析结果缓存（URL -> 缓存条目）
+    _mpd_cache: 'OrderedDict[str, Dict]' = OrderedDict()
+    # yt-dlp可用性探测结果，None表示尚未探测
+    _ytdlp_available: Optional[bool] = None
+    # mp4decrypt可用性，首次调用时确定
+    _mp4decrypt_available: Optional[bool] = None
+    
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # 长连接池需容纳并发下载的线程，CDN偶发的5xx自动重试
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504)),
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._external_decrypt_slots = asyncio.Semaphore(EXTERNAL_DECRYPT_WORKERS)
         
     def parse_clearkey(self, license_key: str) -> Dict[str, str]:
         """解析ClearKey许可证"""
@@ -41,19 +486,30 @@ class DashClearKeyDecryptor:
             'key': key.strip()
         }
     
+    @classmethod
+    async def _ensure_ytdlp(cls) -> bool:
+        """检测yt-dlp是否可用，每个进程只探测一次"""
+        if cls._ytdlp_available is None:
+            if shutil.which('yt-dlp') is None:
+                cls._ytdlp_available = False
+            else:
+                try:
+                    process = await asyncio.create_subprocess_exec(
+                        'yt-dlp', '--version',
+                        stdout=asyncio.subprocess.DEVNULL,
+                        stderr=asyncio.subprocess.DEVNULL
+                    )
+                    cls._ytdlp_available = await process.wait() == 0
+                except OSError:
+                    cls._ytdlp_available = False
+        return cls._ytdlp_available
+    
     async def decrypt_with_yt_dlp(self, mpd_url: str, output_dir: str, 
                                  license_key: str = None) -> Optional[str]:
         """使用yt-dlp解密DASH流"""
         try:
             # 检查yt-dlp是否可用
-            result = await asyncio.create_subprocess_exec(
-                'yt-dlp', '--version',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await result.communicate()
-            
-            if result.returncode != 0:
+            if not await self._ensure_ytdlp():
                 logger.warning("yt-dlp不可用")
                 return None
             
@@ -81,39 +537,45 @@ class DashClearKeyDecryptor:
             
             cmd.append(mpd_url)
             
-            logger.info(f"执行yt-dlp解密: {mpd_url}")
+            logger.info("执行yt-dlp解密: %s", mpd_url)
             
             process = await asyncio.create_subprocess_exec(
                 *cmd,
-                stdout=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.PIPE
             )
             
-            stdout, stderr = await process.communicate()
+            _, stderr = await process.communicate()
             
             if process.returncode == 0:
                 # 查找生成的文件
                 for ext in ['mp4', 'mkv', 'webm']:
                     potential_file = f'{temp_output}.{ext}'
                     if os.path.exists(potential_file):
-                        logger.info(f"yt-dlp解密成功: {potential_file}")
+                        logger.info("yt-dlp解密成功: %s", potential_file)
                         return potential_file
                         
                 logger.error("yt-dlp执行成功但找不到输出文件")
             else:
                 error_msg = stderr.decode('utf-8', errors='ignore')
-                logger.error(f"yt-dlp解密失败: {error_msg}")
+                logger.error("yt-dlp解密失败: %s", error_msg)
                 
             return None
             
         except Exception as e:
-            logger.error(f"yt-dlp解密异常: {e}")
+            logger.error("yt-dlp解密异常: %s", e)
             return None
     
-    async def decrypt_with_yt_dlp_to_pipe(self, mpd_url: str, license_key: str = None) -> subprocess.Popen:
-        """使用yt-dlp解密DASH流并通过管道输出"""
+    async def decrypt_with_yt_dlp_to_pipe(self, mpd_url: str, license_key: str = None, *,
+                                          stdout_fd: int) -> Optional[asyncio.subprocess.Process]:
+        """使用yt-dlp解密DASH流并通过管道输出
+        
+        yt-dlp直接写入stdout_fd（如本进程的stdout），数据不经过Python；
+        下游(FFmpeg)读取变慢时背压会沿管道传回yt-dlp。
+        """
         try:
             cmd = ['yt-dlp']
+            key_file = key_fd = None
             
             # 基本下载选项
             cmd.extend([
@@ -136,68 +598,92 @@ class DashClearKeyDecryptor:
                         }]
                     })
                     
-                    # 通过环境变量或临时文件传递密钥
-                    import tempfile
-                    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                        f.write(clearkey_json)
-                        key_file = f.name
+                    # POSIX下通过继承的管道fd传递密钥，不落盘
+                    key_file, key_fd = _clearkey_source(clearkey_json)
                     
                     cmd.extend(['--external-downloader-args', f'clearkey:{key_file}'])
-                    logger.info(f"使用ClearKey解密: key_id={clearkey['key_id'][:8]}...")
+                    logger.info("使用ClearKey解密: key_id=%s...", clearkey['key_id'][:8])
             
             cmd.append(mpd_url)
             
-            logger.info(f"启动yt-dlp管道解密: {' '.join(cmd[:3])}...")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("启动yt-dlp管道解密: %s...", ' '.join(cmd[:3]))
             
-            # 启动进程，输出到stdout供管道使用
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=False  # 二进制模式
-            )
+            # 启动进程：stdout直接写入目标fd
+            write_fd = os.dup(stdout_fd)
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdout=write_fd,
+                    stderr=asyncio.subprocess.PIPE,
+                    pass_fds=(key_fd,) if key_fd is not None else ()
+                )
+            except Exception:
+                if key_fd is None and key_file:
+                    os.unlink(key_file)  # 进程未启动，清理临时密钥文件
+                raise
+            finally:
+                os.close(write_fd)
+                if key_fd is not None:
+                    os.close(key_fd)
             
             return process
             
         except Exception as e:
-            logger.error(f"yt-dlp管道解密启动失败: {e}")
+            logger.error("yt-dlp管道解密启动失败: %s", e)
             return None
 
     async def decrypt_with_manual_method(self, mpd_url: str, output_dir: str, 
                                         license_key: str) -> Optional[str]:
         """手动下载和解密方法"""
         try:
-            # 1. 下载MPD清单
-            mpd_content = self._download_mpd(mpd_url)
-            if not mpd_content:
-                return None
-            
-            # 2. 解析MPD获取加密信息和segment信息
-            encryption_info, segments = self._parse_mpd(mpd_content, mpd_url)
+            # 1-2. 下载并解析MPD获取加密信息和segment信息（清单未变化时使用缓存）
+            encryption_info, segments = self._load_mpd(mpd_url)
             if not segments:
                 logger.error("无法从MPD获取segment信息")
                 return None
             
-            # 3. 下载加密的segments（限制数量用于测试）
+            # 3-4. 下载与解密流水线：生产者提前下载到有界队列，消费者按顺序解密
+            clearkey = self.parse_clearkey(license_key)
+            cenc_decryptors = {}
             encrypted_files = []
-            for i, segment_info in enumerate(segments[:5]):  # 只下载前5个segment进行测试
-                segment_file = os.path.join(output_dir, f'encrypted_segment_{i}.mp4')
-                if self._download_segment(segment_info['url'], segment_file):
-                    encrypted_files.append(segment_file)
+            decrypted_files = []
+            decrypt_tasks = []
+            queue = asyncio.Queue(maxsize=SEGMENT_QUEUE_SIZE)
+            producer = asyncio.create_task(
+                self._produce_segments(segments[:5], output_dir, queue))  # 只下载前5个segment进行测试
+            
+            try:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    i, segment_info, encrypted_file = item
+                    encrypted_files.append(encrypted_file)
+                    
+                    # 优先进程内CENC解密，失败时回退到外部工具
+                    init_url = segment_info.get('init_url')
+                    if init_url not in cenc_decryptors:
+                        cenc_decryptors[init_url] = await asyncio.to_thread(
+                            self._build_cenc_decryptor, clearkey, init_url)
+                    decrypted_file = os.path.join(output_dir, f'decrypted_segment_{i}.mp4')
+                    decrypt_tasks.append((decrypted_file, asyncio.create_task(
+                        self._decrypt_segment_with_clearkey(encrypted_file, decrypted_file, clearkey,
+                                                            cenc_decryptors[init_url]))))
+                
+                # 按segment顺序收集并行解密的结果
+                results = await asyncio.gather(*(task for _, task in decrypt_tasks))
+                decrypted_files = [f for (f, _), ok in zip(decrypt_tasks, results) if ok]
+            finally:
+                if not producer.done():
+                    producer.cancel()
+                for _, task in decrypt_tasks:
+                    task.cancel()
             
             if not encrypted_files:
                 logger.error("未能下载任何加密片段")
                 return None
             
-            # 4. 解密segments
-            decrypted_files = []
-            clearkey = self.parse_clearkey(license_key)
-            
-            for i, encrypted_file in enumerate(encrypted_files):
-                decrypted_file = os.path.join(output_dir, f'decrypted_segment_{i}.mp4')
-                if await self._decrypt_segment_with_clearkey(encrypted_file, decrypted_file, clearkey):
-                    decrypted_files.append(decrypted_file)
-            
             if not decrypted_files:
                 logger.error("未能解密任何片段")
                 return None
@@ -216,146 +702,309 @@ class DashClearKeyDecryptor:
             return None
             
         except Exception as e:
-            logger.error(f"手动解密失败: {e}")
+            logger.error("手动解密失败: %s", e)
             return None
     
-    def _download_mpd(self, mpd_url: str) -> Optional[str]:
-        """下载MPD清单"""
+    async def _produce_segments(self, segments: List[Dict], output_dir: str,
+                                queue: asyncio.Queue):
+        """并发下载segment并按原顺序放入队列，结束时放入None（被取消时不放）"""
+        pending = deque()
+        cancelled = False
+        try:
+            for i, segment_info in enumerate(segments):
+                segment_file = os.path.join(output_dir, f'encrypted_segment_{i}.mp4')
+                task = asyncio.create_task(
+                    asyncio.to_thread(self._download_segment, segment_info['url'], segment_file))
+                pending.append((i, segment_info, segment_file, task))
+                # 窗口已满时按顺序取出最早的下载结果
+                if len(pending) >= SEGMENT_DOWNLOAD_CONCURRENCY:
+                    await self._put_downloaded_segment(pending.popleft(), queue)
+            while pending:
+                await self._put_downloaded_segment(pending.popleft(), queue)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            for *_, task in pending:
+                task.cancel()
+            # 被取消说明消费者已退出，队列满时put会永久阻塞，无需结束标记
+            if not cancelled:
+                await queue.put(None)
+    
+    @staticmethod
+    async def _put_downloaded_segment(entry: tuple, queue: asyncio.Queue):
+        """等待单个下载完成，成功时放入队列"""
+        i, segment_info, segment_file, task = entry
+        if await task:
+            await queue.put((i, segment_info, segment_file))
+    
+    def _load_mpd(self, mpd_url: str) -> tuple:
+        """下载并解析MPD清单，服务端返回304时直接使用缓存的解析结果
+        
+        先查进程内LRU缓存，未命中再读磁盘缓存。
+        """
+        cache_file = _mpd_cache_path(mpd_url)
+        cached = self._mpd_cache.get(mpd_url)
+        if cached is not None:
+            self._mpd_cache.move_to_end(mpd_url)
+        else:
+            cached = _read_mpd_cache(cache_file)
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        
         try:
-            response = self.session.get(mpd_url, timeout=10)
+            response = self.session.get(mpd_url, headers=headers, stream=True, timeout=10)
+            if response.status_code == 304 and cached:
+                response.close()
+                logger.info("MPD清单未变化，使用缓存的解析结果")
+                return cached['encryption_info'], cached['segments']
             response.raise_for_status()
-            return response.text
         except Exception as e:
-            logger.error(f"下载MPD失败: {e}")
-            return None
+            logger.error("下载MPD失败: %s", e)
+            return {}, []
+        
+        # 响应体直接流入解析器（由XML声明决定编码），不在内存中保留整份清单
+        with response:
+            response.raw.decode_content = True
+            encryption_info, segments = self._parse_mpd(response.raw, mpd_url)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if segments and (etag or last_modified):
+            entry = {
+                'url': mpd_url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'encryption_info': encryption_info,
+                'segments': segments,
+            }
+            self._remember_mpd(mpd_url, entry)
+            _write_mpd_cache(cache_file, entry)
+        return encryption_info, segments
     
-    def _parse_mpd(self, mpd_content: str, base_url: str) -> tuple:
-        """解析MPD清单"""
+    @classmethod
+    def _remember_mpd(cls, mpd_url: str, entry: Dict):
+        """写入进程内LRU缓存，超过MPD_CACHE_MAX时淘汰最久未用的条目"""
+        if MPD_CACHE_MAX <= 0:
+            return
+        cls._mpd_cache[mpd_url] = entry
+        cls._mpd_cache.move_to_end(mpd_url)
+        while len(cls._mpd_cache) > MPD_CACHE_MAX:
+            cls._mpd_cache.popitem(last=False)
+    
+    def _parse_mpd(self, mpd_content, base_url: str) -> tuple:
+        """解析MPD清单（单次流式遍历）"""
         try:
-            root = ET.fromstring(mpd_content)
             segments = []
             encryption_info = {}
+            in_adaptation_set = False
+            representation = None
+            bandwidth = ''
+            segment_template = None
             
-            # 查找AdaptationSet
-            for adaptation_set in root.findall('.//{urn:mpeg:dash:schema:mpd:2011}AdaptationSet'):
-                # 查找ContentProtection
-                for content_protection in adaptation_set.findall('.//{urn:mpeg:dash:schema:mpd:2011}ContentProtection'):
-                    scheme_id = content_protection.get('schemeIdUri', '')
+            if hasattr(mpd_content, 'read'):
+                source = mpd_content  # 流式响应体，边下载边解析
+            else:
+                source = io.BytesIO(mpd_content.encode('utf-8') if isinstance(mpd_content, str) else mpd_content)
+            for event, elem in _etree.iterparse(source, events=('start', 'end'), **_MPD_ITERPARSE_OPTIONS):
+                tag = elem.tag.rsplit('}', 1)[-1] if isinstance(elem.tag, str) else ''
+                if event == 'start':
+                    if tag == 'AdaptationSet':
+                        in_adaptation_set = True
+                    elif tag == 'Representation' and in_adaptation_set:
+                        representation = elem.get('id', '')
+                        bandwidth = elem.get('bandwidth', '')
+                        segment_template = None
+                    continue
+                
+                if tag == 'ContentProtection' and in_adaptation_set:
+                    # 查找ContentProtection
+                    scheme_id = elem.get('schemeIdUri', '')
                     if 'clearkey' in scheme_id.lower():
                         encryption_info = {'type': 'clearkey'}
-                
-                # 查找Representation
-                for representation in adaptation_set.findall('.//{urn:mpeg:dash:schema:mpd:2011}Representation'):
-                    # 查找SegmentTemplate
-                    segment_template = representation.find('.//{urn:mpeg:dash:schema:mpd:2011}SegmentTemplate')
+                elif tag == 'SegmentTemplate' and representation is not None:
+                    if segment_template is None:
+                        segment_template = (elem.get('media'), elem.get('initialization'))
+                elif tag == 'Representation' and representation is not None:
                     if segment_template is not None:
-                        media_template = segment_template.get('media')
-                        if media_template:
-                            # 生成前几个segment URL
-                            for i in range(1, 6):  # 前5个segment
-                                segment_url = media_template.replace('$Number$', str(i))
-                                segment_url = media_template.replace('$RepresentationID$', representation.get('id', ''))
-                                segment_url = urljoin(base_url, segment_url)
-                                segments.append({'url': segment_url, 'number': i})
+                        segments.extend(self._build_segments(
+                            segment_template[0], segment_template[1], representation, base_url,
+                            bandwidth))
+                    representation = None
+                    self._release_element(elem)
+                elif tag == 'AdaptationSet':
+                    in_adaptation_set = False
+                    self._release_element(elem)
             
             return encryption_info, segments
             
         except Exception as e:
-            logger.error(f"解析MPD失败: {e}")
+            logger.error("解析MPD失败: %s", e)
             return {}, []
     
+    @staticmethod
+    def _release_element(elem):
+        """释放已处理的元素及其之前的兄弟节点，使解析内存不随清单长度增长"""
+        elem.clear()
+        if hasattr(elem, 'getprevious'):  # 仅lxml支持
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    
+    @staticmethod
+    def _build_segments(media_template: Optional[str], init_template: Optional[str],
+                        representation_id: str, base_url: str, bandwidth: str = '') -> List[Dict]:
+        """根据SegmentTemplate生成前几个segment的URL"""
+        segments = []
+        init_url = None
+        if init_template:
+            init_format = _compile_segment_template(init_template, representation_id, bandwidth)
+            init_url = urljoin(base_url, init_format.format())
+        if media_template:
+            # 代入的只有数字，先对格式串做一次urljoin，循环内只需format；
+            # base_url中的花括号需转义，否则会被当作格式字段
+            escaped_base = base_url.replace('{', '{{').replace('}', '}}')
+            media_format = urljoin(escaped_base, _compile_segment_template(media_template, representation_id, bandwidth))
+            # 生成前几个segment URL
+            try:
+                for i in range(1, 6):  # 前5个segment
+                    segments.append({'url': media_format.format(Number=i), 'number': i, 'init_url': init_url})
+            except KeyError as e:
+                logger.warning("不支持的SegmentTemplate标识符 %s: %s", e, media_template)
+        return segments
+    
     def _download_segment(self, segment_url: str, output_file: str) -> bool:
         """下载单个segment"""
         try:
-            response = self.session.get(segment_url, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            with open(output_file, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            # 媒体分片本身已压缩，请求identity编码使raw流可直接复制
+            with self.session.get(segment_url, stream=True, timeout=30,
+                                  headers={'Accept-Encoding': 'identity'}) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                
+                # 大缓冲区合并小块写入，减少系统调用次数
+                with open(output_file, 'wb', buffering=SEGMENT_WRITE_BUFFER_SIZE) as f:
+                    shutil.copyfileobj(response.raw, f, SEGMENT_CHUNK_SIZE)
+                    written = f.tell()  # 已写入字节数，无需再stat
             
-            return os.path.exists(output_file) and os.path.getsize(output_file) > 0
+            return written > 0
             
         except Exception as e:
-            logger.error(f"下载segment失败 {segment_url}: {e}")
+            logger.error("下载segment失败 %s: %s", segment_url, e)
             return False
     
+    def _build_cenc_decryptor(self, clearkey: Dict[str, str],
+                              init_url: Optional[str] = None) -> Optional[CencSegmentDecryptor]:
+        """根据ClearKey和初始化分片创建进程内CENC解密器"""
+        if Cipher is None or not clearkey:
+            return None
+        try:
+            key = _hex_to_bytes(clearkey['key'])
+        except ValueError:
+            logger.warning("ClearKey密钥不是十六进制格式，跳过进程内解密")
+            return None
+        
+        if init_url:
+            try:
+                response = self.session.get(init_url, timeout=30)
+                response.raise_for_status()
+                return CencSegmentDecryptor.from_init_segment(key, response.content)
+            except Exception as e:
+                logger.warning("下载初始化分片失败，使用默认CENC参数: %s", e)
+        return CencSegmentDecryptor(key)
+    
     async def _decrypt_segment_with_clearkey(self, encrypted_file: str, decrypted_file: str, 
-                                           clearkey: Dict[str, str]) -> bool:
+                                           clearkey: Dict[str, str],
+                                           cenc_decryptor: Optional[CencSegmentDecryptor] = None) -> bool:
         """使用ClearKey解密segment"""
         try:
-            # 尝试使用mp4decrypt（如果可用）
+            # 优先进程内解密，只处理加密子样本区间
+            if cenc_decryptor is not None:
+                # cryptography的AES运算会释放GIL，在线程池中多个分片可并行解密且不阻塞下载任务
+                if await asyncio.to_thread(_decrypt_file_worker, cenc_decryptor,
+                                           encrypted_file, decrypted_file):
+                    return True
+                logger.debug("进程内CENC解密不适用，尝试外部工具")
+            
+            # 外部工具每个分片启动一个进程，限制同时运行的数量
+            async with self._external_decrypt_slots:
+                return await self._decrypt_segment_with_tools(encrypted_file, decrypted_file, clearkey)
+            
+        except Exception as e:
+            logger.error("解密segment失败: %s", e)
+            return False
+    
+    async def _decrypt_segment_with_tools(self, encrypted_file: str, decrypted_file: str,
+                                          clearkey: Dict[str, str]) -> bool:
+        """使用mp4decrypt或FFmpeg解密segment"""
+        # 尝试使用mp4decrypt（如果可用）
+        if self._mp4decrypt_available is not False:
             try:
                 process = await asyncio.create_subprocess_exec(
                     'mp4decrypt',
                     '--key', f"{clearkey['key_id']}:{clearkey['key']}",
                     encrypted_file,
                     decrypted_file,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.DEVNULL
                 )
                 
-                stdout, stderr = await process.communicate()
+                await process.wait()
+                DashClearKeyDecryptor._mp4decrypt_available = True
                 
-                if process.returncode == 0 and os.path.exists(decrypted_file):
+                if process.returncode == 0 and _is_nonempty_file(decrypted_file):
                     return True
                     
             except FileNotFoundError:
+                DashClearKeyDecryptor._mp4decrypt_available = False
                 logger.warning("mp4decrypt不可用，尝试其他方法")
-            
-            # 如果mp4decrypt不可用，尝试使用FFmpeg（虽然通常不支持）
-            process = await asyncio.create_subprocess_exec(
-                'ffmpeg', '-y',
-                '-decryption_key', clearkey['key'],
-                '-i', encrypted_file,
-                '-c', 'copy',
-                decrypted_file,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            return process.returncode == 0 and os.path.exists(decrypted_file)
-            
-        except Exception as e:
-            logger.error(f"解密segment失败: {e}")
-            return False
+        
+        # 如果mp4decrypt不可用，尝试使用FFmpeg（虽然通常不支持）
+        process = await asyncio.create_subprocess_exec(
+            'ffmpeg', '-y',
+            '-decryption_key', clearkey['key'],
+            '-i', encrypted_file,
+            '-c', 'copy',
+            decrypted_file,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        
+        await process.wait()
+        
+        return process.returncode == 0 and _is_nonempty_file(decrypted_file)
     
     async def _merge_segments(self, segment_files: List[str], output_file: str) -> bool:
         """合并视频片段"""
         try:
-            # 创建文件列表
-            temp_dir = os.path.dirname(output_file)
-            file_list = os.path.join(temp_dir, 'file_list.txt')
-            
-            with open(file_list, 'w') as f:
-                for segment_file in segment_files:
-                    f.write(f"file '{segment_file}'\n")
+            # 文件列表通过stdin传给concat demuxer，不写临时文件；
+            # 从管道读取时相对路径没有参照目录，因此使用绝对路径
+            file_list = ''.join(
+                "file '{}'\n".format(os.path.abspath(segment_file).replace("'", "'\\''"))
+                for segment_file in segment_files
+            ).encode('utf-8')
             
             process = await asyncio.create_subprocess_exec(
                 'ffmpeg', '-y',
                 '-f', 'concat',
                 '-safe', '0',
-                '-i', file_list,
+                '-protocol_whitelist', 'file,pipe',
+                '-i', 'pipe:0',
                 '-c', 'copy',
                 output_file,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
             )
             
-            stdout, stderr = await process.communicate()
-            
-            # 清理临时文件列表
-            try:
-                os.remove(file_list)
-            except:
-                pass
+            await process.communicate(input=file_list)
             
-            return process.returncode == 0 and os.path.exists(output_file)
+            return process.returncode == 0 and _is_nonempty_file(output_file)
             
         except Exception as e:
-            logger.error(f"合并segments失败: {e}")
+            logger.error("合并segments失败: %s", e)
             return False
     
     async def convert_to_hls(self, input_file: str, output_dir: str) -> bool:
@@ -366,8 +1015,7 @@ class DashClearKeyDecryptor:
             cmd = [
                 'ffmpeg', '-y',
                 '-i', input_file,
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
+                *await _hls_codec_args(input_file),
                 '-f', 'hls',
                 '-hls_time', '6',
                 '-hls_list_size', '10',
@@ -380,14 +1028,14 @@ class DashClearKeyDecryptor:
             
             process = await asyncio.create_subprocess_exec(
                 *cmd,
-                stdout=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.PIPE
             )
             
-            stdout, stderr = await process.communicate()
+            _, stderr = await process.communicate()
             
             if process.returncode == 0 and os.path.exists(playlist_path):
-                logger.info(f"HLS转换成功: {playlist_path}")
+                logger.info("HLS转换成功: %s", playlist_path)
                 # 删除临时的解密文件
                 try:
                     os.remove(input_file)
@@ -396,11 +1044,11 @@ class DashClearKeyDecryptor:
                 return True
             else:
                 error_msg = stderr.decode('utf-8', errors='ignore')
-                logger.error(f"HLS转换失败: {error_msg}")
+                logger.error("HLS转换失败: %s", error_msg)
                 return False
                 
         except Exception as e:
-            logger.error(f"HLS转换异常: {e}")
+            logger.error("HLS转换异常: %s", e)
             return False
 
 # 主解密函数
@@ -436,28 +1084,100 @@ async def decrypt_dash_to_hls(mpd_url: str, output_dir: str, license_key: str =
             process = await asyncio.create_subprocess_exec(
                 'ffmpeg', '-y',
                 '-i', mpd_url,
-                '-c:v', 'libx264',
-                '-c:a', 'aac',
+                *await _hls_codec_args(mpd_url),
                 '-f', 'hls',
                 '-hls_time', '6',
                 '-hls_list_size', '10',
                 '-hls_flags', 'delete_segments',
                 '-hls_segment_filename', os.path.join(output_dir, 'segment_%03d.ts'),
                 playlist_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
             )
             
-            stdout, stderr = await process.communicate()
+            await process.wait()
             return process.returncode == 0 and os.path.exists(playlist_path)
         
         logger.error("所有解密方法都失败了")
         return False
         
     except Exception as e:
-        logger.error(f"解密转换过程中发生异常: {e}")
+        logger.error("解密转换过程中发生异常: %s", e)
         return False
 
+async def _probe_codecs(source: str) -> Tuple[Optional[str], Optional[str]]:
+    """用ffprobe获取首个视频/音频流的编码，本地文件的成功结果按大小和修改时间缓存"""
+    try:
+        stat = os.stat(source)
+        cache_key = (source, stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        cache_key = None  # 远程URL不缓存
+    if cache_key in _codec_probe_cache:
+        _codec_probe_cache.move_to_end(cache_key)
+        return _codec_probe_cache[cache_key]
+    
+    codecs = {}
+    succeeded = False
+    try:
+        process = await asyncio.create_subprocess_exec(
+            'ffprobe', '-v', 'error',
+            '-show_entries', 'stream=codec_name,codec_type',
+            '-of', 'csv=p=0',
+            source,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(process.communicate(), CODEC_PROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            logger.warning("ffprobe探测超时，HLS转换将重新编码")
+        else:
+            if process.returncode == 0:
+                succeeded = True
+                for line in stdout.decode('utf-8', errors='ignore').splitlines():
+                    codec_name, _, codec_type = line.strip().partition(',')
+                    codecs.setdefault(codec_type, codec_name)
+    except FileNotFoundError:
+        logger.warning("ffprobe不可用，HLS转换将重新编码")
+    
+    result = (codecs.get('video'), codecs.get('audio'))
+    if succeeded and cache_key is not None:
+        _codec_probe_cache[cache_key] = result
+        while len(_codec_probe_cache) > CODEC_PROBE_CACHE_MAX:
+            _codec_probe_cache.popitem(last=False)
+    return result
+
+async def _hls_codec_args(source: str) -> List[str]:
+    """H.264/AAC已符合HLS要求时直接复制流，否则只对不兼容的流重新编码"""
+    video_codec, audio_codec = await _probe_codecs(source)
+    if video_codec != 'h264':
+        return ['-c:v', 'libx264', '-c:a', 'aac']
+    
+    logger.info("源编码兼容HLS，复制视频流 (video=%s, audio=%s)", video_codec, audio_codec)
+    return ['-c:v', 'copy', '-c:a', 'copy' if audio_codec in ('aac', None) else 'aac']
+
+def _clearkey_source(clearkey_json: str) -> Tuple[str, Optional[int]]:
+    """准备传给子进程的ClearKey JSON，返回 (文件路径, 需继承的fd)
+    
+    POSIX下写入管道并通过/dev/fd/N暴露给子进程（fd需经pass_fds继承），
+    Windows下回退到临时文件，fd为None。
+    """
+    data = clearkey_json.encode('utf-8')
+    if os.name == 'posix':
+        read_fd, write_fd = os.pipe()
+        try:
+            os.write(write_fd, data)  # 远小于管道缓冲区，不会阻塞
+        finally:
+            os.close(write_fd)
+        return f'/dev/fd/{read_fd}', read_fd
+    
+    fd, key_file = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    return key_file, None
+
 # 新增：管道模式解密函数
 async def decrypt_dash_to_pipe(mpd_url: str, license_key: str = None, output_format: str = 'ts') -> int:
     """解密DASH流并通过管道输出 - 用于与FFmpeg连接"""
@@ -466,50 +1186,50 @@ async def decrypt_dash_to_pipe(mpd_url: str, license_key: str = None, output_for
     
     try:
         # 使用yt-dlp进行管道解密
-        logger.info(f"启动管道模式解密: {mpd_url}")
+        logger.info("启动管道模式解密: %s", mpd_url)
         
+        # yt-dlp直接继承本进程的stdout，数据在内核中从yt-dlp流向FFmpeg
+        sys.stdout.buffer.flush()
+        stdout_fd = sys.stdout.buffer.fileno()
         if license_key:
             logger.info("检测到ClearKey许可证，使用yt-dlp解密管道")
-            process = await decryptor.decrypt_with_yt_dlp_to_pipe(mpd_url, license_key)
+            started = await decryptor.decrypt_with_yt_dlp_to_pipe(mpd_url, license_key, stdout_fd=stdout_fd)
         else:
             logger.info("无加密流，使用yt-dlp直接下载管道")
-            process = await decryptor.decrypt_with_yt_dlp_to_pipe(mpd_url)
+            started = await decryptor.decrypt_with_yt_dlp_to_pipe(mpd_url, stdout_fd=stdout_fd)
         
-        if process:
-            # 将解密后的数据转发到stdout
+        if started:
+            process = started
+            # 并发读取stderr，避免其缓冲区写满导致yt-dlp阻塞
+            stderr_task = asyncio.create_task(process.stderr.read())
             try:
-                while True:
-                    chunk = process.stdout.read(8192)  # 8KB chunks
-                    if not chunk:
-                        break
-                    sys.stdout.buffer.write(chunk)
-                    sys.stdout.buffer.flush()
-                
                 # 等待进程完成
-                returncode = process.wait()
+                returncode = await process.wait()
                 
                 if returncode == 0:
                     logger.info("管道解密完成")
                     return 0
                 else:
-                    stderr_output = process.stderr.read().decode('utf-8', errors='ignore')
-                    logger.error(f"管道解密失败: {stderr_output}")
+                    stderr_output = (await stderr_task).decode('utf-8', errors='ignore')
+                    logger.error("管道解密失败: %s", stderr_output)
                     return returncode
                     
             except Exception as e:
-                logger.error(f"管道数据传输失败: {e}")
+                logger.error("管道数据传输失败: %s", e)
                 process.kill()
                 return 1
+            finally:
+                stderr_task.cancel()
         else:
             logger.error("无法启动解密进程")
             return 1
             
     except Exception as e:
-        logger.error(f"管道解密异常: {e}")
+        logger.error("管道解密异常: %s", e)
         return 1
 
-# 命令行工具
-if __name__ == '__main__':
+def build_argparser():
+    """构建命令行参数解析器，供命令行入口和测试复用"""
     import argparse
     
     parser = argparse.ArgumentParser(description='DASH流ClearKey解密工具')
@@ -519,8 +1239,11 @@ if __name__ == '__main__':
     parser.add_argument('--output-format', choices=['file', 'pipe'], default='file', help='输出格式')
     parser.add_argument('--pipe-format', choices=['mp4', 'ts'], default='ts', help='管道输出格式')
     parser.add_argument('--verbose', '-v', action='store_true', help='详细日志')
-    
-    args = parser.parse_args()
+    return parser
+
+# 命令行工具
+if __name__ == '__main__':
+    args = build_argparser().parse_args()
     
     # 设置日志
     log_level = logging.DEBUG if args.verbose else logging.INFO
@@ -5,17 +5,71 @@
 """
 
 import sys
-import requests
 import json
+import http.client
 from urllib.parse import urlparse
 
-def check_health(url="http://localhost:8080/health", timeout=10):
-    """检查服务健康状态"""
+# 本机地址直接用http.client一次性请求，不加载任何HTTP库
+_LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+# 远程地址使用的urllib3连接池，首次使用时创建
+_HTTP = None
+
+def _get_local(parsed, timeout, method='GET'):
+    """通过http.client请求本机服务，返回 (状态码, 响应体)"""
+    path = parsed.path or '/'
+    if parsed.query:
+        path = f"{path}?{parsed.query}"
+    
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+    try:
+        conn.request(method, path)
+        response = conn.getresponse()
+        return response.status, response.read() if method != 'HEAD' else b''
+    finally:
+        conn.close()
+
+def _get_remote(url, timeout, method='GET'):
+    """通过urllib3请求远程服务，异常统一转换为内置异常类型"""
+    global _HTTP
+    import urllib3
+    
+    if _HTTP is None:
+        # 不重试，失败直接上报
+        _HTTP = urllib3.PoolManager(retries=False)
+    
+    try:
+        response = _HTTP.request(method, url, timeout=urllib3.Timeout(total=timeout))
+        return response.status, response.data
+    except (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ProtocolError) as e:
+        # NewConnectionError 是 TimeoutError 的子类，需先于超时处理
+        raise ConnectionError(str(e)) from e
+    except urllib3.exceptions.TimeoutError as e:
+        raise TimeoutError(str(e)) from e
+    except urllib3.exceptions.HTTPError as e:
+        raise http.client.HTTPException(str(e)) from e
+
+def check_health(url="http://localhost:8080/health", timeout=10, fast=False):
+    """检查服务健康状态
+    
+    fast模式只发送HEAD请求并根据状态码判断，不读取和解析响应体
+    """
+    method = 'HEAD' if fast else 'GET'
     try:
-        response = requests.get(url, timeout=timeout)
+        parsed = urlparse(url)
+        if parsed.scheme == 'http' and parsed.hostname in _LOCAL_HOSTS:
+            status, body = _get_local(parsed, timeout, method)
+        else:
+            status, body = _get_remote(url, timeout, method)
+        
+        if fast:
+            if status == 200:
+                return 0
+            print(f"❌ HTTP错误: {status}")
+            return 1
         
-        if response.status_code == 200:
-            data = response.json()
+        if status == 200:
+            data = json.loads(body)
             
             if data.get('status') == 'healthy':
                 print("✅ 服务健康")
@@ -26,16 +80,16 @@ def check_health(url="http://localhost:8080/health", timeout=10):
                 print(f"❌ 服务状态异常: {data.get('status')}")
                 return 1
         else:
-            print(f"❌ HTTP错误: {response.status_code}")
+            print(f"❌ HTTP错误: {status}")
             return 1
             
-    except requests.exceptions.ConnectionError:
-        print("❌ 无法连接到服务")
-        return 1
-    except requests.exceptions.Timeout:
+    except TimeoutError:
         print("❌ 连接超时")
         return 1
-    except requests.exceptions.RequestException as e:
+    except OSError:
+        print("❌ 无法连接到服务")
+        return 1
+    except http.client.HTTPException as e:
         print(f"❌ 请求错误: {e}")
         return 1
     except json.JSONDecodeError:
@@ -55,13 +109,15 @@ def main():
                        help='超时时间(秒) (默认: 10)')
     parser.add_argument('--quiet', '-q', action='store_true',
                        help='静默模式，只返回退出码')
+    parser.add_argument('--fast', action='store_true',
+                       help='快速模式，只检查HTTP状态码 (HEAD请求)')
     
     args = parser.parse_args()
     
     if not args.quiet:
         print(f"🔍 检查服务健康状态: {args.url}")
     
-    exit_code = check_health(args.url, args.timeout)
+    exit_code = check_health(args.url, args.timeout, args.fast)
     
     if not args.quiet and exit_code == 0:
         print("🎉 健康检查通过")
@@ -7,29 +7,121 @@ MPD流媒体服务监控脚本
 import sys
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Tuple
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 生成报告时并发请求的工作线程数
+MONITOR_WORKERS = 8
+
+# 熔断：连续失败达到阈值后，在 基础窗口*退避倍数 秒内不再探测该URL
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_BASE_WINDOW = 30
+CIRCUIT_MAX_BACKOFF = 12
+
+# 报告中固定不变的文本
+_SEP = '=' * 50
+_HEALTHY = "✅ 服务状态: 健康"
+_UNHEALTHY = "❌ 服务状态: 异常"
+_ACTIVE = "🟢 活跃"
+_STOPPED = "🔴 停止"
+
+
+def _load_json(response: requests.Response):
+    """解析JSON响应体，可用时用orjson直接解析bytes"""
+    if orjson is None:
+        return response.json()
+    return orjson.loads(response.content)
+
+
+def _dump_report(report: Dict) -> str:
+    """格式化输出JSON报告，epoch时间戳在此转换为ISO格式"""
+    report = dict(report, timestamp=datetime.fromtimestamp(report["timestamp"]).isoformat())
+    if orjson is None:
+        return json.dumps(report, indent=2, ensure_ascii=False)
+    return orjson.dumps(report, option=orjson.OPT_INDENT_2).decode('utf-8')
+
 
 class ServiceMonitor:
     def __init__(self, base_url: str = "http://localhost:8080", timeout: int = 10):
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
+        # 轮询用到的URL只拼接一次
+        self._status_url = f"{self.base_url}/api/status"
+        self._streams_url = f"{self.base_url}/api/streams"
+        self._stream_status_tmpl = f"{self.base_url}/api/streams/{{}}/status"
+        # 并发请求共享keep-alive连接，连接池容量与线程数一致
+        self.session = self._create_session()
+        self._connection_failed = False
+        self._pool = ThreadPoolExecutor(max_workers=MONITOR_WORKERS)
+        # URL -> {failures, opened_at, backoff}
+        self._circuits: Dict[str, Dict] = {}
+    
+    @staticmethod
+    def _create_session() -> requests.Session:
+        """创建带连接池和网关错误重试的会话"""
+        session = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MONITOR_WORKERS, max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def _reset_session(self):
+        """连接失败后丢弃可能半开的连接，换用新会话"""
+        self.session.close()
+        self.session = self._create_session()
+        self._connection_failed = False
+    
+    def _circuit_open(self, url: str) -> bool:
+        """熔断打开期间直接判定离线，不再等待超时"""
+        circuit = self._circuits.get(url)
+        if not circuit or circuit["failures"] < CIRCUIT_FAILURE_THRESHOLD:
+            return False
+        return time.monotonic() - circuit["opened_at"] < CIRCUIT_BASE_WINDOW * circuit["backoff"]
+    
+    def _record_result(self, url: str, ok: bool):
+        """记录探测结果，成功时复位熔断状态"""
+        if ok:
+            self._circuits.pop(url, None)
+            return
+        circuit = self._circuits.setdefault(url, {"failures": 0, "opened_at": 0.0, "backoff": 1})
+        circuit["failures"] += 1
+        if circuit["failures"] >= CIRCUIT_FAILURE_THRESHOLD:
+            if circuit["opened_at"]:
+                circuit["backoff"] = min(circuit["backoff"] * 2, CIRCUIT_MAX_BACKOFF)
+            circuit["opened_at"] = time.monotonic()
         
     def check_service_health(self) -> Tuple[bool, Dict]:
         """检查服务健康状态"""
+        if self._circuit_open(self._status_url):
+            return False, {"error": "连续失败，暂停探测"}
+        ok, data = self._fetch_service_health()
+        self._record_result(self._status_url, ok)
+        return ok, data
+    
+    def _fetch_service_health(self) -> Tuple[bool, Dict]:
         try:
-            response = requests.get(f"{self.base_url}/api/status", timeout=self.timeout)
+            response = self.session.get(self._status_url, timeout=self.timeout)
             
             if response.status_code == 200:
-                data = response.json()
+                data = _load_json(response)
                 return True, data
             else:
                 return False, {"error": f"HTTP {response.status_code}"}
                 
         except requests.exceptions.ConnectionError:
+            self._connection_failed = True
             return False, {"error": "连接失败"}
         except requests.exceptions.Timeout:
             return False, {"error": "连接超时"}
@@ -38,25 +130,35 @@ class ServiceMonitor:
     
     def get_streams_status(self) -> Tuple[bool, List[Dict]]:
         """获取流状态"""
+        if self._circuit_open(self._streams_url):
+            return False, []
+        ok, data = self._fetch_streams_status()
+        self._record_result(self._streams_url, ok)
+        return ok, data
+    
+    def _fetch_streams_status(self) -> Tuple[bool, List[Dict]]:
         try:
-            response = requests.get(f"{self.base_url}/api/streams", timeout=self.timeout)
+            response = self.session.get(self._streams_url, timeout=self.timeout)
             
             if response.status_code == 200:
-                return True, response.json()
+                return True, _load_json(response)
             else:
                 return False, []
                 
+        except requests.exceptions.ConnectionError:
+            self._connection_failed = True
+            return False, []
         except Exception:
             return False, []
     
     def check_stream_health(self, stream_id: str) -> Dict:
         """检查单个流的健康状态"""
         try:
-            response = requests.get(f"{self.base_url}/api/streams/{stream_id}/status", 
-                                  timeout=self.timeout)
+            response = self.session.get(self._stream_status_tmpl.format(stream_id),
+                                        timeout=self.timeout)
             
             if response.status_code == 200:
-                return response.json()
+                return _load_json(response)
             else:
                 return {"status": "error", "error": f"HTTP {response.status_code}"}
                 
@@ -66,19 +168,28 @@ class ServiceMonitor:
     def generate_report(self) -> Dict:
         """生成监控报告"""
         report = {
-            "timestamp": datetime.now().isoformat(),
+            # 只记录epoch时间，输出时再格式化
+            "timestamp": time.time(),
             "service": {},
             "streams": {},
             "summary": {}
         }
         
+        # 服务状态与流状态并发请求，总耗时取两者中较慢的一个
+        service_future = self._pool.submit(self.check_service_health)
+        streams_future = self._pool.submit(self.get_streams_status)
+        
         # 检查服务状态
-        service_ok, service_data = self.check_service_health()
+        service_ok, service_data = service_future.result()
         report["service"]["healthy"] = service_ok
         report["service"]["data"] = service_data
         
         # 检查流状态
-        streams_ok, streams_data = self.get_streams_status()
+        streams_ok, streams_data = streams_future.result()
+        
+        # 两个请求都结束后再轮换会话，避免关闭仍在使用的连接
+        if self._connection_failed:
+            self._reset_session()
         report["streams"]["accessible"] = streams_ok
         report["streams"]["data"] = streams_data
         
@@ -98,41 +209,46 @@ class ServiceMonitor:
         """打印监控报告"""
         if quiet:
             return
-            
-        print(f"\n🔍 MPD流媒体服务监控报告")
-        print(f"📅 时间: {report['timestamp']}")
-        print(f"{'='*50}")
+        
+        # 先拼接完整报告再一次性写出，避免逐行print的锁和系统调用开销
+        out = []
+        out.append(f"\n🔍 MPD流媒体服务监控报告")
+        out.append(f"📅 时间: {datetime.fromtimestamp(report['timestamp']).isoformat(timespec='seconds')}")
+        out.append(_SEP)
         
         # 服务状态
         service = report["service"]
         if service["healthy"]:
-            print("✅ 服务状态: 健康")
+            out.append(_HEALTHY)
             if "status" in service["data"]:
-                print(f"   状态: {service['data']['status']}")
+                out.append(f"   状态: {service['data']['status']}")
         else:
-            print("❌ 服务状态: 异常")
-            print(f"   错误: {service['data'].get('error', '未知错误')}")
+            out.append(_UNHEALTHY)
+            out.append(f"   错误: {service['data'].get('error', '未知错误')}")
         
         # 流状态
         if report["streams"]["accessible"]:
             summary = report["summary"]
-            print(f"\n📺 流状态:")
-            print(f"   总数: {summary['total_streams']}")
-            print(f"   活跃: {summary['active_streams']}")
-            print(f"   非活跃: {summary['inactive_streams']}")
+            out.append(f"\n📺 流状态:")
+            out.append(f"   总数: {summary['total_streams']}")
+            out.append(f"   活跃: {summary['active_streams']}")
+            out.append(f"   非活跃: {summary['inactive_streams']}")
             
             # 详细流信息
             if summary['total_streams'] > 0:
-                print(f"\n📋 流详情:")
+                out.append(f"\n📋 流详情:")
                 for stream in report["streams"]["data"]:
-                    status = "🟢 活跃" if stream.get('active', False) else "🔴 停止"
-                    print(f"   {stream.get('id', 'N/A')}: {status}")
-                    print(f"      名称: {stream.get('name', 'N/A')}")
-                    print(f"      URL: {stream.get('mpd_url', 'N/A')[:50]}...")
+                    status = _ACTIVE if stream.get('active', False) else _STOPPED
+                    out.append(f"   {stream.get('id', 'N/A')}: {status}")
+                    out.append(f"      名称: {stream.get('name', 'N/A')}")
+                    out.append(f"      URL: {stream.get('mpd_url', 'N/A')[:50]}...")
         else:
-            print("\n❌ 无法获取流状态")
+            out.append("\n❌ 无法获取流状态")
+        
+        out.append(_SEP)
         
-        print(f"{'='*50}")
+        sys.stdout.write('\n'.join(out) + '\n')
+        sys.stdout.flush()
     
     def continuous_monitor(self, interval: int = 30, quiet: bool = False):
         """持续监控模式"""
@@ -181,7 +297,7 @@ def main():
         report = monitor.generate_report()
         
         if args.json:
-            print(json.dumps(report, indent=2, ensure_ascii=False))
+            print(_dump_report(report))
         else:
             monitor.print_report(report, args.quiet)
         
@@ -8,11 +8,28 @@ import requests
 import json
 import sys
 import argparse
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _load_json(response: requests.Response):
+    """解析JSON响应体，可用时用orjson直接解析bytes，省去文本解码"""
+    if orjson is None:
+        return response.json()
+    return orjson.loads(response.content)
 
 class StreamManager:
     def __init__(self, server_url: str = "http://localhost:8080"):
         self.server_url = server_url.rstrip('/')
+        # 复用连接，多次请求共享同一个keep-alive连接池
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=10)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
     def add_stream_from_kodi_format(self, kodi_text: str, name: str = None) -> Dict[str, Any]:
         """从Kodi格式添加流"""
@@ -23,24 +40,42 @@ class StreamManager:
             data['name'] = name
         
         try:
-            response = requests.post(f"{self.server_url}/streams", json=data)
-            return response.json()
+            response = self.session.post(f"{self.server_url}/streams", json=data)
+            return _load_json(response)
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def add_streams_from_kodi_file(self, path: str) -> List[Dict[str, Any]]:
+        """从文件批量添加Kodi格式的流
+        
+        每个流由若干 #KODIPROP 行加一行URL组成，所有请求复用同一个keep-alive连接
+        """
+        results = []
+        block = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                block.append(line)
+                if line.startswith('http'):
+                    results.append(self.add_stream_from_kodi_format('\n'.join(block)))
+                    block = []
+        return results
+    
     def list_streams(self) -> Dict[str, Any]:
         """列出所有流"""
         try:
-            response = requests.get(f"{self.server_url}/streams")
-            return response.json()
+            response = self.session.get(f"{self.server_url}/streams")
+            return _load_json(response)
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def health_check(self) -> Dict[str, Any]:
         """健康检查"""
         try:
-            response = requests.get(f"{self.server_url}/health")
-            return response.json()
+            response = self.session.get(f"{self.server_url}/health")
+            return _load_json(response)
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -57,6 +92,11 @@ def main():
                            help='Kodi格式的流信息')
     add_parser.add_argument('--name', help='流名称')
     
+    # 批量添加流命令
+    bulk_parser = subparsers.add_parser('add-bulk', help='从文件批量添加流')
+    bulk_parser.add_argument('--file', required=True,
+                            help='包含多个Kodi格式流信息的文件')
+    
     # 列出流命令
     subparsers.add_parser('list', help='列出所有流')
     
@@ -80,13 +120,26 @@ def main():
         else:
             print(f"❌ 添加失败: {result.get('error')}")
     
+    elif args.command == 'add-bulk':
+        results = manager.add_streams_from_kodi_file(args.file)
+        added = 0
+        for result in results:
+            if result.get('success'):
+                added += 1
+                print(f"✅ {result['stream_id']}: {args.server}{result['hls_url']}")
+            else:
+                print(f"❌ 添加失败: {result.get('error')}")
+        print(f"📺 共添加 {added}/{len(results)} 个流")
+    
     elif args.command == 'list':
         result = manager.list_streams()
         if 'streams' in result:
-            print(f"📺 共有 {len(result['streams'])} 个流:")
+            # 拼接后一次写出，流较多时避免逐行print
+            out = [f"📺 共有 {len(result['streams'])} 个流:"]
             for stream in result['streams']:
-                print(f"  - {stream['id']}: {stream['name']}")
-                print(f"    HLS URL: {args.server}{stream['hls_url']}")
+                out.append(f"  - {stream['id']}: {stream['name']}")
+                out.append(f"    HLS URL: {args.server}{stream['hls_url']}")
+            sys.stdout.write('\n'.join(out) + '\n')
         else:
             print(f"❌ 获取流列表失败: {result.get('error')}")
     
@@ -8,6 +8,12 @@ import sys
 import os
 import asyncio
 import yaml
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 from app import MPDToHLSStreamer
 
 def test_auto_config():
@@ -32,7 +38,7 @@ def test_auto_config():
             
             # 读取并验证配置内容
             with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=_YamlLoader)
             
             print(f"📋 流数量: {len(config.get('streams', []))}")
             print(f"🌐 服务器端口: {config.get('server', {}).get('port', 'N/A')}")
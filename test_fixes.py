@@ -9,9 +9,8 @@ sys.path.append(os.path.dirname(__file__))
 
 from app import MPDToHLSStreamer
 
-async def test_error_analysis():
+async def test_error_analysis(streamer: MPDToHLSStreamer):
     """测试错误分析功能"""
-    streamer = MPDToHLSStreamer()
     
     # 测试各种错误类型的分析
     test_cases = [
@@ -30,9 +29,8 @@ async def test_error_analysis():
         print(f"包含预期关键词: {expected_keyword.lower() in result.lower()}")
         print("-" * 50)
 
-async def test_retry_logic():
+async def test_retry_logic(streamer: MPDToHLSStreamer):
     """测试重试逻辑"""
-    streamer = MPDToHLSStreamer()
     
     print("\n=== 重试逻辑测试 ===")
     
@@ -52,9 +50,8 @@ async def test_retry_logic():
             print(f"重试次数: {retry_count}, 是否重试: {should_retry}, 延迟: {delay}s")
         print("-" * 50)
 
-async def test_connectivity():
+async def test_connectivity(streamer: MPDToHLSStreamer):
     """测试连接性检查"""
-    streamer = MPDToHLSStreamer()
     
     print("\n=== 连接性测试 ===")
     
@@ -65,21 +62,27 @@ async def test_connectivity():
         "https://nonexistentdomain12345.com/",  # 应该失败
     ]
     
-    for url in test_urls:
-        try:
-            result = await streamer.test_stream_connectivity(url, timeout=5)
-            print(f"URL: {url}")
+    # 各URL的探测互不依赖，并发进行，总耗时取最慢的一个
+    results = await asyncio.gather(
+        *(streamer.test_stream_connectivity(url, timeout=5) for url in test_urls),
+        return_exceptions=True
+    )
+    
+    for url, result in zip(test_urls, results):
+        print(f"URL: {url}")
+        if isinstance(result, Exception):
+            print(f"错误: {result}")
+        else:
             print(f"连接性: {result}")
-        except Exception as e:
-            print(f"URL: {url}")
-            print(f"错误: {e}")
         print("-" * 50)
 
 async def main():
     """运行所有测试"""
-    await test_error_analysis()
-    await test_retry_logic()
-    await test_connectivity()
+    # 加载配置、初始化解密器开销较大，所有测试共用一个实例
+    streamer = MPDToHLSStreamer()
+    await test_error_analysis(streamer)
+    await test_retry_logic(streamer)
+    await test_connectivity(streamer)
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -3,136 +3,139 @@
 测试解密管道功能
 """
 import asyncio
+import contextlib
+import io
 import sys
 import os
 import tempfile
-import subprocess
 from pathlib import Path
 
 sys.path.append(os.path.dirname(__file__))
-from app import MPDToHLSStreamer
+from app import MPDToHLSStreamer, _tool_available
+
+# 管道测试的FFmpeg固定参数，只有输出路径随临时目录变化
+_FFMPEG_PIPE_TEST_ARGS = (
+    'ffmpeg',
+    '-y',  # 覆盖输出文件
+    '-f', 'mpegts',  # 输入格式为MPEG-TS
+    '-i', 'pipe:0',  # 从stdin读取
+    '-t', '5',  # 只处理5秒进行测试
+    '-c:v', 'libx264',
+    '-c:a', 'aac',
+    '-f', 'hls',
+    '-hls_time', '2',
+    '-hls_list_size', '3',
+    '-hls_flags', 'delete_segments',
+)
 
 async def test_pipe_functionality():
     """测试管道解密功能"""
     print("=== 管道解密功能测试 ===")
     
-    # 创建临时测试环境
-    temp_dir = tempfile.mkdtemp()
-    print(f"临时测试目录: {temp_dir}")
-    
-    try:
-        # 初始化流媒体服务器
-        streamer = MPDToHLSStreamer()
-        
-        # 测试用的MPD URL（公开无加密流）
-        test_mpd_url = "https://dash.akamaized.net/akamai/bbb_30fps/bbb_30fps.mpd"
-        
-        # 测试1: 无加密流的管道处理
-        print("\n--- 测试1: 无加密流管道处理 ---")
-        
-        # 构建解密命令
-        decrypt_cmd = [
-            'python', 
-            os.path.join(os.path.dirname(__file__), 'decrypt_dash.py'),
-            test_mpd_url,
-            '--output-format', 'pipe',
-            '--pipe-format', 'ts'
-        ]
+    # 创建临时测试环境，退出时自动清理；Linux下放在tmpfs上，HLS分片不进入磁盘写回
+    shm_dir = '/dev/shm' if os.access('/dev/shm', os.W_OK) else None
+    with tempfile.TemporaryDirectory(prefix='mpd_pipe_', dir=shm_dir, ignore_cleanup_errors=True) as temp_dir:
+        print(f"临时测试目录: {temp_dir}")
         
-        print(f"解密命令: {' '.join(decrypt_cmd)}")
-        
-        # 启动解密进程（但不实际运行，只测试命令构建）
         try:
-            result = subprocess.run(
-                decrypt_cmd + ['--help'],  # 用help测试命令可用性
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
+            # 初始化流媒体服务器
+            streamer = MPDToHLSStreamer()
             
-            if result.returncode == 0:
-                print("✅ 解密命令构建成功")
-            else:
-                print(f"❌ 解密命令失败: {result.stderr}")
+            # 测试用的MPD URL（公开无加密流）
+            test_mpd_url = "https://dash.akamaized.net/akamai/bbb_30fps/bbb_30fps.mpd"
+            
+            # 测试1: 无加密流的管道处理
+            print("\n--- 测试1: 无加密流管道处理 ---")
+            
+            # 构建解密命令
+            decrypt_cmd = [
+                'python', 
+                os.path.join(os.path.dirname(__file__), 'decrypt_dash.py'),
+                test_mpd_url,
+                '--output-format', 'pipe',
+                '--pipe-format', 'ts'
+            ]
+            
+            print(f"解密命令: {' '.join(decrypt_cmd)}")
+            
+            # 在进程内检查命令行参数，无需启动新的解释器执行 --help
+            try:
+                import decrypt_dash
+                parser = decrypt_dash.build_argparser()
+                args = parser.parse_args(decrypt_cmd[2:])
                 
-        except subprocess.TimeoutExpired:
-            print("⏰ 解密命令测试超时")
-        except Exception as e:
-            print(f"❌ 解密命令测试异常: {e}")
-        
-        # 测试2: FFmpeg管道连接
-        print("\n--- 测试2: FFmpeg管道连接测试 ---")
-        
-        ffmpeg_cmd = [
-            'ffmpeg',
-            '-y',  # 覆盖输出文件
-            '-f', 'mpegts',  # 输入格式为MPEG-TS
-            '-i', 'pipe:0',  # 从stdin读取
-            '-t', '5',  # 只处理5秒进行测试
-            '-c:v', 'libx264',
-            '-c:a', 'aac',
-            '-f', 'hls',
-            '-hls_time', '2',
-            '-hls_list_size', '3',
-            '-hls_flags', 'delete_segments',
-            '-hls_segment_filename', os.path.join(temp_dir, 'test_segment_%03d.ts'),
-            os.path.join(temp_dir, 'test_playlist.m3u8')
-        ]
-        
-        print(f"FFmpeg命令: {' '.join(ffmpeg_cmd[:8])}...")
-        
-        # 检查FFmpeg是否可用
-        try:
-            result = subprocess.run(['ffmpeg', '-version'], 
-                                  capture_output=True, timeout=5)
-            if result.returncode == 0:
+                if (args.mpd_url, args.output_format, args.pipe_format) == (test_mpd_url, 'pipe', 'ts'):
+                    print("✅ 解密命令构建成功")
+                else:
+                    print(f"❌ 解密命令解析结果不符: {args}")
+                
+                # 非法的输出格式应被拒绝
+                try:
+                    with contextlib.redirect_stderr(io.StringIO()):
+                        parser.parse_args([test_mpd_url, '--output-format', 'ts'])
+                    print("❌ 非法的 --output-format 未被拒绝")
+                except SystemExit:
+                    print("✅ 非法的 --output-format 被拒绝")
+                    
+            except SystemExit:
+                print("❌ 解密命令参数无效")
+            except Exception as e:
+                print(f"❌ 解密命令测试异常: {e}")
+            
+            # FFmpeg探测（子进程）与流连接性检查（网络）互不依赖，并发进行，结果按测试顺序输出
+            ffmpeg_ok, connectivity = await asyncio.gather(
+                asyncio.to_thread(_tool_available, 'ffmpeg', '-version'),
+                streamer.test_stream_connectivity(test_mpd_url, timeout=10)
+            )
+            
+            # 测试2: FFmpeg管道连接
+            print("\n--- 测试2: FFmpeg管道连接测试 ---")
+            
+            ffmpeg_cmd = [
+                *_FFMPEG_PIPE_TEST_ARGS,
+                '-hls_segment_filename', os.path.join(temp_dir, 'test_segment_%03d.ts'),
+                os.path.join(temp_dir, 'test_playlist.m3u8')
+            ]
+            
+            print(f"FFmpeg命令: {' '.join(ffmpeg_cmd[:8])}...")
+            
+            # 检查FFmpeg是否可用（进程内缓存，PATH中不存在时不启动子进程）
+            if ffmpeg_ok:
                 print("✅ FFmpeg可用")
             else:
-                print("❌ FFmpeg不可用")
-        except:
-            print("❌ FFmpeg不可用或超时")
-        
-        # 测试3: 流服务器配置
-        print("\n--- 测试3: 流服务器配置测试 ---")
-        
-        # 测试配置加载
-        config = streamer.config
-        print(f"配置加载: {'✅' if config else '❌'}")
-        print(f"FFmpeg配置: {config.get('ffmpeg', {})}")
-        
-        # 测试连接性检查
-        connectivity = await streamer.test_stream_connectivity(test_mpd_url, timeout=10)
-        print(f"连接性测试: {'✅' if connectivity else '❌'} - {test_mpd_url}")
-        
-        # 测试4: 错误分析功能
-        print("\n--- 测试4: 错误分析功能 ---")
-        
-        test_errors = [
-            ("Connection reset by peer", 152),
-            ("Pipe broken", -15),
-            ("Permission denied", 1),
-            ("404 Not Found", 1)
-        ]
-        
-        for error_text, return_code in test_errors:
-            analysis = streamer._analyze_ffmpeg_error(error_text, return_code)
-            print(f"错误: '{error_text}' -> {analysis}")
-        
-        print("\n=== 测试完成 ===")
-        return True
-        
-    except Exception as e:
-        print(f"❌ 测试异常: {e}")
-        return False
-        
-    finally:
-        # 清理临时目录
-        import shutil
-        try:
-            shutil.rmtree(temp_dir)
-            print(f"清理临时目录: {temp_dir}")
-        except:
-            pass
+                print("❌ FFmpeg不可用或超时")
+            
+            # 测试3: 流服务器配置
+            print("\n--- 测试3: 流服务器配置测试 ---")
+            
+            # 测试配置加载
+            config = streamer.config
+            print(f"配置加载: {'✅' if config else '❌'}")
+            print(f"FFmpeg配置: {config.get('ffmpeg', {})}")
+            
+            # 测试连接性检查
+            print(f"连接性测试: {'✅' if connectivity else '❌'} - {test_mpd_url}")
+            
+            # 测试4: 错误分析功能
+            print("\n--- 测试4: 错误分析功能 ---")
+            
+            test_errors = [
+                ("Connection reset by peer", 152),
+                ("Pipe broken", -15),
+                ("Permission denied", 1),
+                ("404 Not Found", 1)
+            ]
+            
+            analyses = streamer._analyze_ffmpeg_errors(test_errors)
+            for (error_text, return_code), analysis in zip(test_errors, analyses):
+                print(f"错误: '{error_text}' -> {analysis}")
+            
+            print("\n=== 测试完成 ===")
+            return True
+            
+        except Exception as e:
+            print(f"❌ 测试异常: {e}")
+            return False
 
 def test_decrypt_script_syntax():
     """测试解密脚本语法"""
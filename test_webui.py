@@ -3,41 +3,52 @@
 Web UI 功能测试脚本
 """
 
-import requests
+import asyncio
+import aiohttp
 import json
 import time
 import sys
+from urllib.parse import urlparse
 
-def test_server_health(base_url):
+# 所有测试请求共享的keep-alive连接池
+CONNECTOR_LIMIT = 16
+KEEPALIVE_TIMEOUT = 30
+
+# 等待服务器启动：总等待时间上限、轮询间隔和单次TCP连接超时
+STARTUP_TIMEOUT = 20
+POLL_INTERVAL = 0.05
+CONNECT_TIMEOUT = 0.1
+
+async def test_server_health(session, base_url):
     """测试服务器健康状态"""
     print("🔍 测试服务器健康状态...")
     try:
-        response = requests.get(f"{base_url}/health", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            print(f"✅ 服务器健康: {data.get('status')}")
-            print(f"📊 活跃流数: {data.get('active_streams', 0)}")
-            return True
-        else:
-            print(f"❌ 健康检查失败: HTTP {response.status_code}")
-            return False
+        async with session.get(f"{base_url}/health", timeout=aiohttp.ClientTimeout(total=5)) as response:
+            if response.status == 200:
+                data = await response.json()
+                print(f"✅ 服务器健康: {data.get('status')}")
+                print(f"📊 活跃流数: {data.get('active_streams', 0)}")
+                return True
+            else:
+                print(f"❌ 健康检查失败: HTTP {response.status}")
+                return False
     except Exception as e:
         print(f"❌ 连接失败: {e}")
         return False
 
-def test_stream_api(base_url):
+async def test_stream_api(session, base_url):
     """测试流管理API"""
     print("\n📡 测试流管理API...")
     
     # 1. 获取流列表
     try:
-        response = requests.get(f"{base_url}/streams")
-        if response.status_code == 200:
-            streams = response.json().get('streams', [])
-            print(f"✅ 获取流列表成功: {len(streams)} 个流")
-        else:
-            print(f"❌ 获取流列表失败: HTTP {response.status_code}")
-            return False
+        async with session.get(f"{base_url}/streams") as response:
+            if response.status == 200:
+                streams = (await response.json()).get('streams', [])
+                print(f"✅ 获取流列表成功: {len(streams)} 个流")
+            else:
+                print(f"❌ 获取流列表失败: HTTP {response.status}")
+                return False
     except Exception as e:
         print(f"❌ API请求失败: {e}")
         return False
@@ -51,56 +62,62 @@ def test_stream_api(base_url):
     }
     
     try:
-        response = requests.post(
-            f"{base_url}/streams",
-            json=test_stream,
-            headers={'Content-Type': 'application/json'}
-        )
+        async with session.post(f"{base_url}/streams", json=test_stream) as response:
+            if response.status != 200:
+                print(f"❌ 添加流请求失败: HTTP {response.status}")
+                return False
+            result = await response.json()
         
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('success'):
-                stream_id = result.get('stream_id')
-                print(f"✅ 添加测试流成功: {stream_id}")
-                
-                # 3. 获取流状态
-                try:
-                    status_response = requests.get(f"{base_url}/streams/{stream_id}/status")
-                    if status_response.status_code == 200:
-                        status = status_response.json()
-                        print(f"✅ 获取流状态成功: {status.get('status', 'unknown')}")
-                    else:
-                        print(f"⚠️  获取流状态失败: HTTP {status_response.status_code}")
-                except Exception as e:
-                    print(f"⚠️  获取流状态出错: {e}")
+        if not result.get('success'):
+            print(f"❌ 添加流失败: {result.get('error')}")
+            return False
                 
-                # 4. 删除测试流
-                try:
-                    delete_response = requests.delete(f"{base_url}/streams/{stream_id}")
-                    if delete_response.status_code == 200:
-                        delete_result = delete_response.json()
-                        if delete_result.get('success'):
-                            print(f"✅ 删除测试流成功")
-                        else:
-                            print(f"⚠️  删除测试流失败: {delete_result.get('error')}")
+        stream_id = result.get('stream_id')
+        print(f"✅ 添加测试流成功: {stream_id}")
+        
+        # 3. 获取流状态
+        try:
+            async with session.get(f"{base_url}/streams/{stream_id}/status") as status_response:
+                if status_response.status == 200:
+                    status = await status_response.json()
+                    print(f"✅ 获取流状态成功: {status.get('status', 'unknown')}")
+                else:
+                    print(f"⚠️  获取流状态失败: HTTP {status_response.status}")
+        except Exception as e:
+            print(f"⚠️  获取流状态出错: {e}")
+        
+        # 4. 删除测试流
+        try:
+            async with session.delete(f"{base_url}/streams/{stream_id}") as delete_response:
+                if delete_response.status == 200:
+                    delete_result = await delete_response.json()
+                    if delete_result.get('success'):
+                        print(f"✅ 删除测试流成功")
                     else:
-                        print(f"⚠️  删除请求失败: HTTP {delete_response.status_code}")
-                except Exception as e:
-                    print(f"⚠️  删除测试流出错: {e}")
+                        print(f"⚠️  删除测试流失败: {delete_result.get('error')}")
+                else:
+                    print(f"⚠️  删除请求失败: HTTP {delete_response.status}")
+        except Exception as e:
+            print(f"⚠️  删除测试流出错: {e}")
                 
-                return True
-            else:
-                print(f"❌ 添加流失败: {result.get('error')}")
-                return False
-        else:
-            print(f"❌ 添加流请求失败: HTTP {response.status_code}")
-            return False
+        return True
             
     except Exception as e:
         print(f"❌ 添加流出错: {e}")
         return False
 
-def test_web_ui(base_url):
+async def _probe_page(session, base_url, path, name):
+    """访问单个页面，返回要输出的结果行"""
+    try:
+        async with session.get(f"{base_url}{path}", timeout=aiohttp.ClientTimeout(total=5)) as response:
+            await response.read()
+            if response.status == 200:
+                return f"✅ {name} 访问成功"
+            return f"⚠️  {name} 访问失败: HTTP {response.status}"
+    except Exception as e:
+        return f"❌ {name} 访问出错: {e}"
+
+async def test_web_ui(session, base_url):
     """测试Web界面访问"""
     print("\n🌐 测试Web界面...")
     
@@ -111,17 +128,46 @@ def test_web_ui(base_url):
         ('/health', '健康检查API')
     ]
     
-    for path, name in pages:
+    # 各页面互不依赖，并发请求后按原顺序输出
+    results = await asyncio.gather(*(_probe_page(session, base_url, path, name) for path, name in pages))
+    for line in results:
+        print(line)
+
+async def _port_open(host, port):
+    """尝试建立TCP连接，能连上说明服务已开始监听"""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), CONNECT_TIMEOUT)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    await writer.wait_closed()
+    return True
+
+async def wait_for_server(session, base_url):
+    """先在TCP层等待端口可连，再确认健康检查接口，服务器就绪后立即返回"""
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    parsed = urlparse(base_url)
+    host = parsed.hostname
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    
+    while not await _port_open(host, port):
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(POLL_INTERVAL)
+    
+    while True:
         try:
-            response = requests.get(f"{base_url}{path}", timeout=5)
-            if response.status_code == 200:
-                print(f"✅ {name} 访问成功")
-            else:
-                print(f"⚠️  {name} 访问失败: HTTP {response.status_code}")
-        except Exception as e:
-            print(f"❌ {name} 访问出错: {e}")
+            async with session.get(f"{base_url}/health", timeout=aiohttp.ClientTimeout(total=2)) as response:
+                if response.status == 200:
+                    return True
+        except Exception:
+            pass
 
-def main():
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(POLL_INTERVAL)
+
+async def main():
     print("🧪 MPD流媒体服务 Web UI 测试")
     print("=" * 50)
     
@@ -134,38 +180,28 @@ def main():
     print(f"🎯 测试目标: {base_url}")
     print("=" * 50)
     
-    # 等待服务器启动
-    print("⏳ 等待服务器启动...")
-    max_retries = 10
-    for i in range(max_retries):
-        try:
-            response = requests.get(f"{base_url}/health", timeout=2)
-            if response.status_code == 200:
-                print("✅ 服务器已就绪")
-                break
-        except:
-            pass
-        
-        if i < max_retries - 1:
-            print(f"⏳ 等待中... ({i + 1}/{max_retries})")
-            time.sleep(2)
-        else:
+    connector = aiohttp.TCPConnector(limit=CONNECTOR_LIMIT, keepalive_timeout=KEEPALIVE_TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # 等待服务器启动
+        print("⏳ 等待服务器启动...")
+        if not await wait_for_server(session, base_url):
             print("❌ 服务器启动超时")
             return False
+        print("✅ 服务器已就绪")
     
-    # 执行测试
-    success = True
+        # 执行测试
+        success = True
     
-    # 测试服务器健康状态
-    if not test_server_health(base_url):
-        success = False
+        # 测试服务器健康状态
+        if not await test_server_health(session, base_url):
+            success = False
     
-    # 测试流管理API
-    if not test_stream_api(base_url):
-        success = False
+        # 测试流管理API
+        if not await test_stream_api(session, base_url):
+            success = False
     
-    # 测试Web界面
-    test_web_ui(base_url)
+        # 测试Web界面
+        await test_web_ui(session, base_url)
     
     print("\n" + "=" * 50)
     if success:
@@ -179,5 +215,5 @@ def main():
     return success
 
 if __name__ == '__main__':
-    success = main()
+    success = asyncio.run(main())
     sys.exit(0 if success else 1)
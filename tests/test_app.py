@@ -11,6 +11,11 @@ from unittest.mock import patch, MagicMock
 import sys
 import yaml
 
+try:
+    from yaml import CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeDumper as _YamlDumper
+
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
@@ -18,10 +23,11 @@ from app import MPDToHLSStreamer
 
 class TestMPDToHLSStreamer(unittest.TestCase):
     
-    def setUp(self):
-        """测试前准备"""
+    @classmethod
+    def setUpClass(cls):
+        """测试前准备：这些测试都不修改实例状态，整个测试类共用一个streamer"""
         # 创建临时配置文件
-        self.temp_config = tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False)
+        cls.temp_config = tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False)
         test_config = {
             'server': {'host': '127.0.0.1', 'port': 8081},
             'streams': [],
@@ -33,17 +39,18 @@ class TestMPDToHLSStreamer(unittest.TestCase):
                 'audio_codec': 'aac'
             }
         }
-        yaml.dump(test_config, self.temp_config)
-        self.temp_config.close()
+        yaml.dump(test_config, cls.temp_config, Dumper=_YamlDumper)
+        cls.temp_config.close()
         
-        self.streamer = MPDToHLSStreamer(self.temp_config.name)
+        cls.streamer = MPDToHLSStreamer(cls.temp_config.name)
     
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """测试后清理"""
-        os.unlink(self.temp_config.name)
+        os.unlink(cls.temp_config.name)
         # 清理streamer资源
-        if hasattr(self.streamer, '__del__'):
-            self.streamer.__del__()
+        if hasattr(cls.streamer, '__del__'):
+            cls.streamer.__del__()
     
     def test_parse_kodi_props(self):
         """测试Kodi属性解析"""
@@ -67,6 +74,13 @@ https://example.com/sample/stream.mpd"""
         self.assertEqual(result['key_id'], '1234567890abcdef1234567890abcdef')
         self.assertEqual(result['key'], 'fedcba0987654321fedcba0987654321')
     
+    def test_analyze_ffmpeg_error_priority(self):
+        """测试错误分析按规则优先级而非出现位置匹配"""
+        output = "HTTP error 404 Not Found\nConnection refused"
+        self.assertIn("连接被拒绝", self.streamer._analyze_ffmpeg_error(output, 1))
+        results = self.streamer._analyze_ffmpeg_errors([("SSL handshake failed", 1), ("", 7), ("???", 9)])
+        self.assertEqual(results, ["SSL/TLS握手失败，可能是证书问题", "进程异常退出 (代码: 7)", "未知错误 (代码: 9)"])
+    
     def test_load_config(self):
         """测试配置文件加载"""
         config = self.streamer.load_config()
@@ -88,31 +102,58 @@ https://example.com/sample/stream.mpd"""
 class TestStreamManager(unittest.TestCase):
     """测试流管理工具"""
     
-    def setUp(self):
-        # 假设有一个运行的服务器用于测试
+    @classmethod
+    def setUpClass(cls):
+        # 假设有一个运行的服务器用于测试；请求均被mock，整个测试类共用一个manager
         sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
         from stream_manager import StreamManager
-        self.manager = StreamManager("http://localhost:8081")
+        cls.manager = StreamManager("http://localhost:8081")
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_health_check(self, mock_get):
         """测试健康检查"""
         mock_response = MagicMock()
         mock_response.json.return_value = {'status': 'healthy', 'active_streams': 0}
+        mock_response.content = b'{"status": "healthy", "active_streams": 0}'
         mock_get.return_value = mock_response
         
         result = self.manager.health_check()
         self.assertEqual(result['status'], 'healthy')
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_list_streams(self, mock_get):
         """测试获取流列表"""
         mock_response = MagicMock()
         mock_response.json.return_value = {'streams': []}
+        mock_response.content = b'{"streams": []}'
         mock_get.return_value = mock_response
         
         result = self.manager.list_streams()
         self.assertIn('streams', result)
 
+class TestServiceMonitor(unittest.TestCase):
+    """测试监控脚本"""
+    
+    @patch('requests.Session.get')
+    def test_circuit_opens_after_consecutive_failures(self, mock_get):
+        """连续失败后熔断，不再发起请求；成功后复位"""
+        from monitor import ServiceMonitor, CIRCUIT_FAILURE_THRESHOLD
+        import requests
+        monitor = ServiceMonitor("http://localhost:8081")
+        mock_get.side_effect = requests.exceptions.ConnectionError()
+        
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD + 2):
+            healthy, _ = monitor.check_service_health()
+            self.assertFalse(healthy)
+        self.assertEqual(mock_get.call_count, CIRCUIT_FAILURE_THRESHOLD)
+        
+        monitor._circuits[monitor._status_url]["opened_at"] -= 3600
+        mock_get.side_effect = None
+        mock_get.return_value = MagicMock(status_code=200, content=b'{"status": "running"}',
+                                          json=MagicMock(return_value={'status': 'running'}))
+        healthy, _ = monitor.check_service_health()
+        self.assertTrue(healthy)
+        self.assertNotIn(monitor._status_url, monitor._circuits)
+
 if __name__ == '__main__':
     unittest.main()
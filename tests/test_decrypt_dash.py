@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+测试脚本 - 验证decrypt_dash.py的进程内CENC解密
+"""
+
+import unittest
+import os
+import struct
+import sys
+
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from decrypt_dash import CencSegmentDecryptor, DashClearKeyDecryptor
+
+KEY = bytes.fromhex('fedcba0987654321fedcba0987654321')
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type: bytes, version: int, flags: int, payload: bytes) -> bytes:
+    return box(box_type, struct.pack('>I', (version << 24) | flags) + payload)
+
+
+def build_fragment(samples, senc_entries) -> bytes:
+    """构造 moof(traf(tfhd, trun, senc)) + mdat 分片"""
+    senc_payload = struct.pack('>I', len(senc_entries))
+    for iv, subsamples in senc_entries:
+        senc_payload += iv + struct.pack('>H', len(subsamples))
+        for clear_bytes, encrypted_bytes in subsamples:
+            senc_payload += struct.pack('>HI', clear_bytes, encrypted_bytes)
+
+    def moof(data_offset):
+        tfhd = full_box(b'tfhd', 0, 0x020000, struct.pack('>I', 1))
+        trun = full_box(b'trun', 0, 0x000201, struct.pack('>Ii', len(samples), data_offset)
+                        + b''.join(struct.pack('>I', len(s)) for s in samples))
+        senc = full_box(b'senc', 0, 0x000002, senc_payload)
+        return box(b'moof', box(b'traf', tfhd + trun + senc))
+
+    moof_size = len(moof(0))
+    return moof(moof_size + 8) + box(b'mdat', b''.join(samples))
+
+
+def build_init(scheme: bytes, tenc_payload: bytes, tenc_version: int) -> bytes:
+    """构造包含 encv/sinf(schm, schi/tenc) 的初始化分片"""
+    sinf = box(b'sinf', box(b'frma', b'avc1')
+               + full_box(b'schm', 0, 0, scheme + struct.pack('>I', 0x10000))
+               + box(b'schi', full_box(b'tenc', tenc_version, 0, tenc_payload)))
+    encv = box(b'encv', bytes(78) + sinf)
+    stsd = full_box(b'stsd', 0, 0, struct.pack('>I', 1) + encv)
+    return box(b'moov', box(b'trak', box(b'mdia', box(b'minf', box(b'stbl', stsd)))))
+
+
+class TestCencSegmentDecryptor(unittest.TestCase):
+
+    def test_decrypt_cenc_subsamples(self):
+        """cenc: 只解密子样本中的加密区间"""
+        plain = [os.urandom(100), os.urandom(50)]
+        ivs = [os.urandom(8), os.urandom(8)]
+        subsamples = [[(10, 80), (5, 5)], [(0, 50)]]
+
+        encrypted = []
+        for sample, iv, ranges in zip(plain, ivs, subsamples):
+            encryptor = Cipher(algorithms.AES(KEY), modes.CTR(iv + bytes(8))).encryptor()
+            out, pos = bytearray(sample), 0
+            for clear_bytes, encrypted_bytes in ranges:
+                pos += clear_bytes
+                out[pos:pos + encrypted_bytes] = encryptor.update(sample[pos:pos + encrypted_bytes])
+                pos += encrypted_bytes
+            encrypted.append(bytes(out))
+
+        fragment = build_fragment(encrypted, list(zip(ivs, subsamples)))
+        result = CencSegmentDecryptor(KEY).decrypt(fragment)
+
+        self.assertIsNotNone(result)
+        self.assertTrue(result.endswith(plain[0] + plain[1]))
+
+    def test_decrypt_cbcs_pattern(self):
+        """cbcs: 常量IV + 1:9加密pattern"""
+        constant_iv = os.urandom(16)
+        tenc = bytes([0, 0x19, 1, 0]) + bytes(16) + bytes([16]) + constant_iv
+        init = build_init(b'cbcs', tenc, tenc_version=1)
+
+        sample = os.urandom(200)
+        encryptor = Cipher(algorithms.AES(KEY), modes.CBC(constant_iv)).encryptor()
+        out = bytearray(sample)
+        # 16字节明文头，之后每10个块加密第1个，结尾不足一块的部分保持明文
+        for block_start in (16, 16 + 160):
+            out[block_start:block_start + 16] = encryptor.update(sample[block_start:block_start + 16])
+
+        fragment = build_fragment([bytes(out)], [(b'', [(16, 184)])])
+        decryptor = CencSegmentDecryptor.from_init_segment(KEY, init)
+
+        self.assertEqual(decryptor.scheme, 'cbcs')
+        self.assertEqual((decryptor.crypt_byte_block, decryptor.skip_byte_block), (1, 9))
+        self.assertEqual(decryptor.decrypt(fragment)[-200:], sample)
+
+    def test_unencrypted_fragment_returns_none(self):
+        """没有senc的分片交给外部工具处理"""
+        fragment = box(b'moof', box(b'traf', full_box(b'tfhd', 0, 0, struct.pack('>I', 1)))) + box(b'mdat', b'data')
+        self.assertIsNone(CencSegmentDecryptor(KEY).decrypt(fragment))
+
+
+class TestParseMpd(unittest.TestCase):
+
+    MPD = """<?xml version="1.0"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011">
+  <Period>
+    <AdaptationSet mimeType="video/mp4">
+      <ContentProtection schemeIdUri="urn:uuid:e2719d58-a985-b3c9-781a-b030af78d30e" value="ClearKey"/>
+      <Representation id="video-1" bandwidth="800000">
+        <SegmentTemplate initialization="$RepresentationID$/init.mp4"
+                         media="$RepresentationID$/$Bandwidth$/seg-$Number%05d$.m4s"/>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>"""
+
+    def test_segment_template_expansion(self):
+        """模板标识符全部代入，$Number$支持%0Nd宽度"""
+        _, segments = DashClearKeyDecryptor()._parse_mpd(self.MPD, 'http://example.com/live/manifest.mpd')
+
+        self.assertEqual(len(segments), 5)
+        self.assertEqual(segments[0]['url'], 'http://example.com/live/video-1/800000/seg-00001.m4s')
+        self.assertEqual(segments[4]['url'], 'http://example.com/live/video-1/800000/seg-00005.m4s')
+        self.assertEqual(segments[0]['init_url'], 'http://example.com/live/video-1/init.mp4')
+
+    def test_base_url_with_braces(self):
+        """基础URL中的花括号原样保留，不影响模板代入"""
+        _, segments = DashClearKeyDecryptor()._parse_mpd(self.MPD, 'http://example.com/{live}/manifest.mpd')
+
+        self.assertEqual(len(segments), 5)
+        self.assertEqual(segments[0]['url'], 'http://example.com/{live}/video-1/800000/seg-00001.m4s')
+        self.assertEqual(segments[0]['init_url'], 'http://example.com/{live}/video-1/init.mp4')
+
+if __name__ == '__main__':
+    unittest.main()